@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from column_stats import TOP_N, column_value_counts, read_stats, top_values
+from filter_index import condition_from_spec, frame_index
+from join_index import join_tables
+from result_cache import cached_pivot_table, cached_value_counts, dataset_fingerprint
+from scatter_data import draw_scatter, prepare_scatter
+from storage import read_schema, read_table
+
+# Типы отчетов и обязательные параметры каждого из них.
+REPORT_TYPES = {
+    'text': ('filters', 'columns'),
+    'pivot': ('index', 'columns'),
+    'pie': ('column',),
+    'bar': ('column',),
+    'scatter': ('x', 'y'),
+    'join': ('joins',),
+}
+
+# Допустимые форматы вывода; первый — формат по умолчанию.
+OUTPUT_FORMATS = {
+    'text': ('csv', 'txt'),
+    'pivot': ('csv', 'txt'),
+    'pie': ('png',),
+    'bar': ('png',),
+    'scatter': ('png',),
+    'join': ('csv', 'txt'),
+}
+
+
+def load_spec(path: str) -> dict:
+    """
+    Читает и проверяет описание пакета отчетов (JSON).
+
+    Формат описания:
+        {
+            "data_dir": "./data",          # папка со справочниками
+            "output_dir": "./reports",     # куда писать результаты
+            "workers": 4,                  # число потоков (по умолчанию — число ядер)
+            "reports": [
+                {"name": "sales", "type": "text", "dataset": "List1.pkl",
+                 "filters": {"Регион": ["Север", "Юг"], "Сумма": {"min": 1000},
+                             "Товар": {"not": ["Мыло"]}},
+                 "columns": ["Товар", "Сумма"]},
+                {"type": "pivot", "dataset": "List1.pkl", "index": "Регион",
+                 "columns": "Месяц", "values": "Сумма", "aggfunc": "sum"},
+                {"type": "bar", "dataset": "List1.pkl", "column": "Товар", "top": 10},
+                {"type": "scatter", "dataset": "List1.pkl", "x": "Цена", "y": "Сумма"},
+                {"type": "join", "dataset": "List1.pkl", "columns": ["Товар", "Код Клиента"],
+                 "joins": [{"dataset": "List5.pkl", "left_on": "Код Клиента",
+                            "right_on": "Код Клиента", "how": "inner"}]}
+            ]
+        }
+
+    Условия фильтров описаны в filter_index.condition_from_spec.
+    У каждого отчета можно указать "format" (см. OUTPUT_FORMATS) и "name" —
+    имя выходного файла без расширения.
+
+    Returns:
+        dict: Описание с заполненными значениями по умолчанию.
+    """
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+    spec['data_dir'] = os.path.join(base, spec.get('data_dir', './data'))
+    spec['output_dir'] = os.path.join(base, spec.get('output_dir', './reports'))
+    reports = spec.get('reports')
+    if not reports:
+        raise ValueError("В описании нет ни одного отчета (ключ 'reports').")
+
+    names = set()
+    for i, report in enumerate(reports, 1):
+        kind = report.get('type')
+        if kind not in REPORT_TYPES:
+            raise ValueError(f"Отчет №{i}: неизвестный тип '{kind}', допустимы: {', '.join(REPORT_TYPES)}.")
+        missing = [key for key in ('dataset',) + REPORT_TYPES[kind] if key not in report]
+        if missing:
+            raise ValueError(f"Отчет №{i} ({kind}): не заданы параметры {', '.join(missing)}.")
+        report.setdefault('format', OUTPUT_FORMATS[kind][0])
+        if report['format'] not in OUTPUT_FORMATS[kind]:
+            raise ValueError(f"Отчет №{i} ({kind}): формат '{report['format']}' не поддерживается.")
+        report.setdefault('name', f"{i:03d}_{kind}_{os.path.splitext(report['dataset'])[0]}")
+        if report['name'] in names:
+            raise ValueError(f"Отчет №{i}: имя '{report['name']}' уже используется.")
+        names.add(report['name'])
+    return spec
+
+
+def _needed_columns(reports: list, available: set):
+    """
+    Возвращает колонки, нужные отчетам по одному справочнику,
+    или None, если нужна вся таблица.
+
+    Ключи соединений берутся, только если они есть в самом справочнике:
+    остальные приходят из предыдущих соединений.
+    """
+    columns = []
+    for report in reports:
+        kind = report['type']
+        if kind == 'text':
+            columns += list(report['filters']) + list(report['columns'])
+        elif kind == 'pivot':
+            if report.get('values') is None:
+                return None
+            columns += [report['index'], report['columns'], report['values']]
+        elif kind in ('pie', 'bar'):
+            columns.append(report['column'])
+        elif kind == 'join':
+            if report.get('columns') is None:
+                return None
+            columns += list(report['columns'])
+            columns += [join['left_on'] for join in report['joins'] if join['left_on'] in available]
+        else:
+            columns += [report['x'], report['y']]
+    return list(dict.fromkeys(columns))
+
+
+def _save_frame(df, path: str, fmt: str) -> None:
+    if fmt == 'csv':
+        df.to_csv(path, encoding='utf-8-sig')
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(df.to_string())
+
+
+def _save_figure(draw, path: str, figsize=(8, 6)) -> None:
+    # Figure + Agg canvas without pyplot: safe in worker threads and on a server without a display
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    draw(fig.add_subplot())
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def run_report(report: dict, df, dataset: tuple, stats, output_dir: str, data_dir: str) -> str:
+    """
+    Строит один отчет по уже загруженной таблице и сохраняет его в `output_dir`.
+
+    Returns:
+        str: Путь к созданному файлу.
+    """
+    kind = report['type']
+    path = os.path.join(output_dir, f"{report['name']}.{report['format']}")
+
+    if kind == 'text':
+        criteria = {col: condition_from_spec(value) for col, value in report['filters'].items()}
+        positions = frame_index(df).lookup(criteria)
+        _save_frame(df[report['columns']].iloc[positions], path, report['format'])
+    elif kind == 'pivot':
+        pivot = cached_pivot_table(df, report['index'], report['columns'], report.get('values'),
+                                   report.get('aggfunc', 'mean'), dataset=dataset)
+        _save_frame(pivot, path, report['format'])
+    elif kind == 'join':
+        base = df if report.get('columns') is None else df[report['columns']]
+        joins = [dict(join, path=os.path.join(data_dir, join['dataset'])) for join in report['joins']]
+        # Keys that come from an earlier join are not in `df`, the rest are kept for the join
+        keys = [join['left_on'] for join in joins if join['left_on'] in df.columns and join['left_on'] not in base.columns]
+        result = join_tables(df[list(base.columns) + keys], joins)
+        _save_frame(result.drop(columns=keys), path, report['format'])
+    elif kind in ('pie', 'bar'):
+        col = report['column']
+        value_counts = column_value_counts(stats, col)
+        if value_counts is None:
+            value_counts = cached_value_counts(df, col, dataset)
+        value_counts = top_values(value_counts, report.get('top', TOP_N), report.get('other_label', 'Other'))
+
+        def draw(ax):
+            if kind == 'pie':
+                value_counts.plot.pie(autopct='%1.1f%%', startangle=360, ax=ax)
+                ax.set_ylabel('')
+            else:
+                value_counts.plot.bar(ax=ax)
+                ax.set_ylabel('Count')
+            ax.set_title(report.get('title', f'Distribution by {col}'))
+
+        _save_figure(draw, path, (8, 8) if kind == 'pie' else (8, 6))
+    else:
+        x, y = report['x'], report['y']
+        prepared = prepare_scatter(df, x, y)
+
+        def draw(ax):
+            draw_scatter(ax, prepared, x, y)
+            ax.set_title(report.get('title', f'{y} vs {x}'))
+
+        _save_figure(draw, path)
+    return path
+
+
+def run_batch(spec: dict, workers: int = None) -> dict:
+    """
+    Выполняет все отчеты из описания (см. load_spec).
+
+    Каждый справочник загружается один раз — только колонки, нужные его
+    отчетам, — после чего отчеты по нему строятся параллельно в пуле потоков.
+    Ошибка в одном отчете не останавливает остальные.
+
+    Returns:
+        dict: {имя отчета: путь к файлу или исключение}.
+    """
+    output_dir = spec['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or spec.get('workers') or os.cpu_count() or 1
+
+    by_dataset = {}
+    for report in spec['reports']:
+        by_dataset.setdefault(report['dataset'], []).append(report)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as pool:
+        for name, reports in by_dataset.items():
+            path = os.path.join(spec['data_dir'], name)
+            start = time.perf_counter()
+            try:
+                available = set(read_schema(path))
+                columns = _needed_columns(reports, available)
+                if columns is not None:
+                    missing = [col for col in columns if col not in available]
+                    if missing:
+                        raise KeyError(f"в справочнике нет колонок: {', '.join(map(str, missing))}")
+                df = read_table(path, columns)
+                dataset = dataset_fingerprint(path)
+                stats = read_stats(path)
+            except Exception as e:
+                print(f"[-] {name}: не удалось загрузить справочник: {e}")
+                for report in reports:
+                    results[report['name']] = e
+                continue
+            print(f"[✓] Загружен {name}: {len(df)} строк, {len(df.columns)} колонок "
+                  f"({time.perf_counter() - start:.2f} с)")
+
+            # Reports of this dataset run while the next dataset is being loaded
+            futures = [(report, pool.submit(run_report, report, df, dataset, stats, output_dir,
+                                                   spec['data_dir']))
+                       for report in reports]
+            for report, future in futures:
+                results[report['name']] = future
+            del df
+
+        for report_name, future in list(results.items()):
+            if isinstance(future, Exception):
+                continue
+            try:
+                results[report_name] = future.result()
+                print(f"[✓] {report_name} -> {results[report_name]}")
+            except Exception as e:
+                results[report_name] = e
+                print(f"[-] {report_name}: {e}")
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетное построение отчетов без интерактивного ввода.")
+    parser.add_argument('spec', help="JSON-файл с описанием отчетов")
+    parser.add_argument('--output-dir', help="папка для результатов (вместо output_dir из описания)")
+    parser.add_argument('--workers', type=int, help="число потоков")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"[-] Ошибка в описании отчетов: {e}")
+        return 2
+    if args.output_dir:
+        spec['output_dir'] = args.output_dir
+
+    start = time.perf_counter()
+    results = run_batch(spec, args.workers)
+    failed = sum(isinstance(result, Exception) for result in results.values())
+    print(f"Готово: {len(results) - failed} из {len(results)} отчетов за {time.perf_counter() - start:.2f} с.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
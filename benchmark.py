@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import statistics
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+def make_workbook(path: str, rows: int = 10000, columns: int = 6, cardinality: int = 100,
+                  sheets: int = 2, seed: int = 0) -> str:
+    """
+    Создает Excel-файл той же структуры, что DZ_2.xlsx: первый лист — задание
+    (при загрузке пропускается), за ним листы List1…ListN со справочниками.
+
+    Колонки листа по кругу: текст с `cardinality` различными значениями,
+    целочисленный код, дробное число, дата.
+
+    Parameters:
+        path (str): Путь к создаваемому .xlsx-файлу.
+        rows (int): Количество строк в каждом листе.
+        columns (int): Количество колонок в каждом листе.
+        cardinality (int): Количество различных значений в текстовых и кодовых колонках.
+        sheets (int): Количество листов со справочниками.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Returns:
+        str: Путь к созданному файлу.
+    """
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame().to_excel(writer, sheet_name='Task', index=False)
+        for sheet in range(1, sheets + 1):
+            data = {}
+            for i in range(columns):
+                kind = i % 4
+                if kind == 0:
+                    labels = np.array([f'Значение {j}' for j in range(cardinality)])
+                    data[f'Название {i + 1}'] = labels[rng.integers(0, cardinality, rows)]
+                elif kind == 1:
+                    data[f'Код {i + 1}'] = rng.integers(100, 100 + cardinality, rows)
+                elif kind == 2:
+                    data[f'Сумма {i + 1}'] = rng.normal(1000, 250, rows).round(2)
+                else:
+                    data[f'Дата {i + 1}'] = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, rows), 'D')
+            pd.DataFrame(data).to_excel(writer, sheet_name=f'List{sheet}', index=False)
+    return path
+
+
+def _time(func, repeat: int, setup=None) -> list:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(workdir: str, rows: int = 10000, columns: int = 6, cardinality: int = 100,
+                   sheets: int = 2, repeat: int = 3, formats: tuple = ('pickle',), seed: int = 0) -> dict:
+    """
+    Выполняет набор замеров на синтетическом Excel-файле без графического интерфейса.
+
+    Замеры: загрузка Excel (ingest), чтение справочника (load), фильтрация
+    через индекс и через ленивый запрос (filter), сводная таблица без кэша
+    и с кэшем (pivot), подсчет значений для диаграмм (chart).
+
+    Returns:
+        dict: {'meta': параметры и версии, 'results': [{'name', 'seconds', 'min', 'median'}]}.
+    """
+    from db_loader import load_excel_to_pickle
+    from column_stats import count_values, top_values
+    from filter_index import FilterIndex, between
+    from query import Query
+    from result_cache import cached_pivot_table, counts_cache, dataset_fingerprint, pivot_cache
+    from scatter_data import prepare_scatter
+    from storage import read_table, table_path
+
+    excel_path = os.path.join(workdir, 'bench.xlsx')
+    data_dir = os.path.join(workdir, 'data')
+    start = time.perf_counter()
+    make_workbook(excel_path, rows, columns, cardinality, sheets, seed)
+    print(f"[✓] Сгенерирован {excel_path} ({time.perf_counter() - start:.2f} с)")
+
+    results = []
+
+    def record(name, timings):
+        results.append({'name': name, 'seconds': timings, 'min': min(timings), 'median': statistics.median(timings)})
+        print(f"[✓] {name}: мин. {min(timings):.4f} с, медиана {statistics.median(timings):.4f} с")
+
+    def clear_caches():
+        pivot_cache.clear()
+        counts_cache.clear()
+        shutil.rmtree(os.path.join(data_dir, '.cache'), ignore_errors=True)
+
+    record('ingest', _time(lambda: load_excel_to_pickle(excel_path, data_dir, force=True, formats=formats), repeat))
+    record('ingest.unchanged', _time(lambda: load_excel_to_pickle(excel_path, data_dir, formats=formats), repeat))
+
+    path = table_path(data_dir, 'List1', formats[0])
+    record('load.full', _time(lambda: read_table(path), repeat))
+    df = read_table(path)
+    text_col, code_col, value_col = df.columns[0], df.columns[min(1, columns - 1)], df.columns[min(2, columns - 1)]
+    record('load.one_column', _time(lambda: read_table(path, [text_col]), repeat))
+
+    value = str(df[text_col].iloc[0])
+    record('filter.mask_astype_str', _time(lambda: df[df[text_col].astype(str) == value], repeat))
+    record('filter.index_build', _time(lambda: FilterIndex(lambda col: df[col]).lookup({text_col: value}), repeat))
+    index = FilterIndex(lambda col: df[col])
+    index.lookup({text_col: value})
+    record('filter.index_lookup', _time(lambda: df.iloc[index.lookup({text_col: value})], repeat))
+    if pd.api.types.is_numeric_dtype(df[code_col].dtype):
+        low, high = df[code_col].quantile([0.4, 0.6]).tolist()
+        record('filter.query_range', _time(
+            lambda: Query(path).where({code_col: between(low, high)}).select([text_col]).collect(), repeat))
+
+    dataset = dataset_fingerprint(path)
+    record('pivot.pandas', _time(lambda: pd.pivot_table(df, index=text_col, columns=code_col, values=value_col,
+                                                         aggfunc='sum', fill_value=0), repeat))
+    record('pivot.cold_cache', _time(
+        lambda: cached_pivot_table(df, text_col, code_col, value_col, 'sum', dataset=dataset), repeat, clear_caches))
+    record('pivot.warm_cache', _time(
+        lambda: cached_pivot_table(df, text_col, code_col, value_col, 'sum', dataset=dataset), repeat))
+
+    record('chart.value_counts', _time(lambda: df[text_col].value_counts(), repeat))
+    record('chart.count_values_top', _time(lambda: top_values(count_values(df[code_col])), repeat))
+    record('chart.scatter_prepare', _time(lambda: prepare_scatter(df, code_col, value_col), repeat))
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'params': {'rows': rows, 'columns': columns, 'cardinality': cardinality, 'sheets': sheets,
+                       'repeat': repeat, 'formats': list(formats), 'seed': seed},
+        },
+        'results': results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """
+    Печатает сравнение двух файлов результатов по медианам.
+    """
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    if old['meta']['params'] != new['meta']['params']:
+        print("[~] Параметры замеров различаются, сравнение может быть некорректным.")
+    before = {r['name']: r['median'] for r in old['results']}
+    print(f"{'замер':<28}{old['meta']['revision']:>12}{new['meta']['revision']:>12}{'изменение':>12}")
+    for result in new['results']:
+        name, median = result['name'], result['median']
+        if name in before:
+            ratio = median / before[name] if before[name] else float('inf')
+            print(f"{name:<28}{before[name]:>12.4f}{median:>12.4f}{ratio:>11.2f}x")
+        else:
+            print(f"{name:<28}{'—':>12}{median:>12.4f}{'':>12}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетическом Excel-файле.")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--cardinality', type=int, default=100)
+    parser.add_argument('--sheets', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--formats', default='pickle', help="форматы хранения через запятую (pickle,parquet,feather)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help="файл для результатов (JSON)")
+    parser.add_argument('--workdir', help="папка для временных файлов (по умолчанию — временная)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="сравнить два файла результатов")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        report = run_benchmarks(workdir, args.rows, args.columns, args.cardinality, args.sheets, args.repeat,
+                                tuple(args.formats.split(',')), args.seed)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[✓] Результаты сохранены в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+from tkinter import ttk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+
+# Figures are created directly, not through pyplot, so they never enter
+# pyplot's global registry. Released figures are cleared and kept for the
+# next chart window instead of being allocated again.
+class FigurePool:
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.idle = []
+
+    def acquire(self, figsize):
+        if self.idle:
+            figure = self.idle.pop()
+            figure.set_size_inches(figsize)
+            return figure
+        return Figure(figsize=figsize)
+
+    def release(self, figure):
+        figure.clear()
+        if len(self.idle) < self.max_idle:
+            self.idle.append(figure)
+
+
+figure_pool = FigurePool()
+
+
+# Tk canvas around a pooled figure. The figure goes back to the pool when
+# the widget is destroyed; redraws are skipped when the chart key (column,
+# options, data) hasn't changed and are coalesced with draw_idle otherwise.
+class ChartCanvas(ttk.Frame):
+    def __init__(self, parent, figsize=(6, 4), **kwargs):
+        super().__init__(parent, **kwargs)
+        self.figure = figure_pool.acquire(figsize)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.key = None
+        self.bind('<Destroy>', self.on_destroy)
+
+    def axes(self, fresh=False):
+        # Reuse the single axes when possible; a fresh figure also drops colorbars
+        if not fresh and len(self.figure.axes) == 1:
+            ax = self.figure.axes[0]
+            ax.clear()
+            return ax
+        self.figure.clear()
+        return self.figure.add_subplot()
+
+    def is_current(self, key):
+        return key is not None and key == self.key
+
+    def show(self, key=None):
+        self.key = key
+        self.canvas.draw_idle()
+
+    def on_destroy(self, event):
+        if event.widget is self and self.figure is not None:
+            figure_pool.release(self.figure)
+            self.figure = None
@@ -0,0 +1,190 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+# Расширение файла со статистикой листа, который лежит рядом с файлами данных.
+STATS_EXT = '.stats'
+
+# Для колонок с большим числом различных значений частоты не сохраняются.
+MAX_VALUES = 10000
+
+# Число значений, показываемых на круговой и столбчатой диаграммах по умолчанию.
+TOP_N = 20
+
+
+def count_values(series: pd.Series) -> pd.Series:
+    """
+    Считает то же, что series.value_counts(), но для категориальных
+    и целочисленных колонок — через np.bincount по кодам категорий
+    или по самим значениям, без хэш-таблицы.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iu' and len(series):
+        values = series.to_numpy()
+        low, high = int(values.min()), int(values.max())
+        if high - low > max(len(values), 1 << 20):
+            return series.value_counts()
+        counts = np.bincount(values - low if low else values, minlength=high - low + 1)
+        present = np.flatnonzero(counts)
+        counts, uniques = counts[present], pd.Index(present + low).astype(series.dtype)
+    else:
+        return series.value_counts()
+    order = np.argsort(-counts, kind='stable')
+    result = pd.Series(counts[order], index=uniques.take(order), name='count')
+    result.index.name = series.name
+    return result
+
+
+def top_values(value_counts: pd.Series, n: int = TOP_N, other_label: str = 'Other') -> pd.Series:
+    """
+    Оставляет `n` самых частых значений, а остальные объединяет в одно
+    значение `other_label`. Число элементов диаграммы не превышает n + 1.
+
+    Parameters:
+        value_counts (pd.Series): Частоты, отсортированные по убыванию.
+        n (int): Число значений; 0 или None — без ограничения.
+    """
+    if not n or len(value_counts) <= n:
+        return value_counts
+    top = value_counts.iloc[:n]
+    rest = int(value_counts.iloc[n:].sum())
+    index = pd.Index([str(v) for v in top.index] + [other_label], name=value_counts.index.name)
+    return pd.Series(np.append(top.to_numpy(), rest), index=index, name=value_counts.name)
+
+
+class StatsAccumulator:
+    """
+    Собирает статистику по колонкам листа: частоты значений, число пустых
+    ячеек, минимум, максимум и число различных значений.
+
+    Таблица может передаваться целиком или частями (потоковая загрузка);
+    в памяти хранятся только частоты, не больше MAX_VALUES на колонку.
+    """
+
+    def __init__(self, max_values: int = MAX_VALUES):
+        self.max_values = max_values
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        self.rows += len(df)
+        for col in df.columns:
+            series = df[col]
+            stats = self.columns.setdefault(col, {
+                'nulls': 0, 'min': None, 'max': None, 'counts': pd.Series(dtype='int64'), 'overflow': False,
+            })
+            stats['nulls'] += int(series.isna().sum())
+
+            non_null = series.dropna()
+            if len(non_null):
+                try:
+                    low, high = non_null.min(), non_null.max()
+                    stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                    stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+                except TypeError:
+                    pass
+
+            if not stats['overflow']:
+                counts = stats['counts'].add(count_values(series), fill_value=0).astype('int64')
+                if len(counts) > self.max_values:
+                    stats['overflow'] = True
+                    stats['counts'] = None
+                else:
+                    stats['counts'] = counts
+
+    def result(self) -> dict:
+        """
+        Возвращает статистику в виде
+        {'rows': n, 'columns': {колонка: {...}}}, где для каждой колонки есть
+        'nulls', 'min', 'max', 'distinct' (None, если значений больше MAX_VALUES),
+        'value_counts' (как Series.value_counts()) и 'values' (отсортированные
+        строковые значения, как для фильтров отчета); последние два — None
+        для колонок с большим числом значений.
+        """
+        columns = {}
+        for col, stats in self.columns.items():
+            counts = stats['counts']
+            if counts is not None:
+                counts = counts.sort_values(ascending=False, kind='stable')
+                counts.index.name = col
+                counts.name = 'count'
+                values = sorted(pd.Series(counts.index).astype(str).unique().tolist())
+            else:
+                values = None
+            columns[col] = {
+                'nulls': stats['nulls'],
+                'min': stats['min'],
+                'max': stats['max'],
+                'distinct': None if counts is None else len(counts),
+                'value_counts': counts,
+                'values': values,
+            }
+        return {'rows': self.rows, 'columns': columns}
+
+
+def stats_path(data_path: str) -> str:
+    """
+    Возвращает путь к файлу статистики для файла справочника (любого формата).
+    """
+    return os.path.splitext(data_path)[0] + STATS_EXT
+
+
+def write_stats(stats: dict, output_dir: str, name: str) -> str:
+    """
+    Сохраняет статистику листа `name` рядом с его файлами.
+    """
+    path = os.path.join(output_dir, name + STATS_EXT)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_stats(data_path: str):
+    """
+    Загружает статистику для файла справочника.
+
+    Returns:
+        dict или None: None, если статистики нет или она старее файла данных.
+    """
+    path = stats_path(data_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(data_path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def remove_stats(output_dir: str, name: str) -> None:
+    """
+    Удаляет файл статистики листа `name`, если он есть.
+    """
+    path = os.path.join(output_dir, name + STATS_EXT)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def column_value_counts(stats: dict, col):
+    """
+    Возвращает сохраненный результат df[col].value_counts() или None,
+    если статистики нет или частоты колонки не сохранялись.
+    """
+    if stats is None or col not in stats['columns']:
+        return None
+    return stats['columns'][col]['value_counts']
+
+
+def column_values(stats: dict, col):
+    """
+    Возвращает отсортированный список различных непустых значений колонки
+    в строковом виде (как FilterIndex.distinct) или None.
+    """
+    if stats is None or col not in stats['columns']:
+        return None
+    return stats['columns'][col]['values']
@@ -1,14 +1,40 @@
 import os
+import re
+import json
+import time
+import hashlib
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
+from column_stats import StatsAccumulator, remove_stats, stats_path, write_stats
+from storage import (COLUMNAR_FORMATS, PREVIEW_ROWS, ChunkWriter, list_tables, make_preview, preview_path,
+                     read_table, remove_other_formats, remove_table, table_path, write_preview, write_table)
 
+MANIFEST_NAME = 'manifest.json'
 
-def select_dataframe() -> pd.DataFrame:
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_SHARED_STRING_RE = re.compile(rb'<(?:\w+:)?si\b.*?</(?:\w+:)?si>', re.DOTALL)
+_SHARED_STRING_END_RE = re.compile(rb'</(?:\w+:)?si>')
+_SHEET_DATA_START_RE = re.compile(rb'<(?:\w+:)?sheetData\b')
+_SHEET_DATA_END_RE = re.compile(rb'</(?:\w+:)?sheetData>|<(?:\w+:)?sheetData\s*/>')
+_CELL_END_RE = re.compile(rb'</(?:\w+:)?c>')
+_SHARED_CELL_RE = re.compile(rb'<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)</(?:\w+:)?v>')
+
+
+def select_dataframe(columns: list = None) -> pd.DataFrame:
     """
-    Позволяет пользователю выбрать один из .pkl-файлов и загружает DataFrame.
+    Позволяет пользователю выбрать один из сохраненных справочников и загружает DataFrame.
+
+    Parameters:
+        columns (list): Загрузить только эти колонки (None — все).
     """
-    files = [f for f in os.listdir("./data") if f.endswith(".pkl")]
+    files = list_tables("./data")
     if not files:
-        raise FileNotFoundError("Нет доступных .pkl файлов в папке ./data")
+        raise FileNotFoundError("Нет доступных справочников в папке ./data")
 
     print("Доступные справочники:")
     for i, f in enumerate(files):
@@ -18,8 +44,7 @@ def select_dataframe() -> pd.DataFrame:
     if not (0 <= index < len(files)):
         raise IndexError("Некорректный номер справочника")
 
-    df = pd.read_pickle(os.path.join("./data", files[index]))
-    df.columns = df.columns.str.strip()
+    df = read_table(os.path.join("./data", files[index]), columns)
 
     print("\nКолонки:")
     for i, col in enumerate(df.columns):
@@ -29,23 +54,467 @@ def select_dataframe() -> pd.DataFrame:
     return df
 
 
-def load_excel_to_pickle(excel_path: str = 'DZ_2.xlsx', output_dir: str = './data/') -> None:
+def optimize_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5, label: str = '') -> pd.DataFrame:
+    """
+    Уменьшает объем памяти, занимаемый DataFrame.
+
+    Текстовые колонки с небольшим числом различных значений переводятся в
+    category, целые и вещественные числа — в самый узкий тип без потери
+    точности. Экономия по каждой колонке выводится на экран.
+
+    Parameters:
+        df (pd.DataFrame): Исходная таблица.
+        max_category_ratio (float): Максимальная доля различных значений
+            в колонке, при которой она переводится в category.
+        label (str): Имя таблицы для вывода.
+
+    Returns:
+        pd.DataFrame: Таблица с уплотненными типами.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            compact = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            compact = pd.to_numeric(series, downcast='float')
+            # float32 is only kept when every value survives the round trip
+            if not compact.astype(series.dtype).equals(series):
+                continue
+        elif pd.api.types.infer_dtype(series, skipna=True) == 'string':
+            non_null = series.count()
+            if not non_null or series.nunique() / non_null > max_category_ratio:
+                continue
+            compact = series.astype('category')
+        else:
+            continue
+
+        before = series.memory_usage(deep=True, index=False)
+        after = compact.memory_usage(deep=True, index=False)
+        if after >= before:
+            continue
+        df[col] = compact
+        print(f"[~] {label}{col}: {series.dtype} -> {compact.dtype}, "
+              f"{before / 1024:.1f} КБ -> {after / 1024:.1f} КБ")
+    return df
+
+
+def _header_names(row: tuple) -> list:
+    """
+    Строит имена колонок по строке заголовка так же, как pandas.read_excel.
+    """
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f'Unnamed: {i}' if value is None else str(value).strip()
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _is_number(arrow_type) -> bool:
+    import pyarrow as pa
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+
+
+def _chunk_to_arrow(rows: list, names: list, schema):
+    """
+    Превращает часть строк листа в pyarrow.Table.
+
+    Типы колонок определяются по первой части и затем сохраняются для всех
+    последующих; колонки без значений или со смешанными типами хранятся как строки.
+    Значения следующих частей приводятся к этим типам только без потерь:
+    например, дробное число в колонке, ставшей целочисленной по первой части,
+    вызывает ошибку, а не округляется.
+    """
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    arrays = []
+    for i, values in enumerate(columns):
+        field_type = schema.field(i).type if schema is not None else None
+        if field_type is None:
+            try:
+                array = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                array = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+            if pa.types.is_null(array.type):
+                array = array.cast(pa.string())
+        elif pa.types.is_string(field_type):
+            array = pa.array([v if v is None or isinstance(v, str) else str(v) for v in values], type=field_type)
+        else:
+            # Converting straight to field_type would silently truncate 10.5 to 10 in an
+            # int64 column: infer the chunk's own type and cast only when nothing is lost
+            try:
+                array = pa.array(values)
+                if not (pa.types.is_null(array.type) or array.type == field_type
+                        or _is_number(array.type) and _is_number(field_type)
+                        or pa.types.is_temporal(array.type) and pa.types.is_temporal(field_type)):
+                    raise pa.ArrowTypeError(f"{array.type} is not {field_type}")
+                array = array.cast(field_type, safe=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                raise ValueError(
+                    f"Колонка '{names[i]}' содержит значения разных типов ({field_type} и др.) "
+                    f"или дробные числа после целых; загрузите лист без потокового режима."
+                )
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _stream_sheet(excel_path: str, sheet: str, output_dir: str, options: dict) -> tuple:
+    """
+    Читает лист Excel-файла по частям через openpyxl в режиме read-only
+    и дописывает каждую часть в колоночные файлы (см. storage.ChunkWriter).
+
+    В памяти одновременно находится не больше `options['chunk_size']` строк,
+    поэтому потребление памяти не зависит от размера листа. Уплотнение типов
+    (compact) в этом режиме не выполняется: категории разных частей не совпадали бы.
+
+    Returns:
+        tuple: (имя листа, время чтения в секундах, время записи в секундах).
+    """
+    from openpyxl import load_workbook
+
+    parse_time = write_time = 0.0
+    start = time.perf_counter()
+    wb = load_workbook(excel_path, read_only=True, data_only=True)
+    writer = ChunkWriter(output_dir, sheet, options['formats'])
+    stats = StatsAccumulator() if options['stats'] else None
+    head, rows_written = None, 0
+    try:
+        rows = wb[sheet].iter_rows(values_only=True)
+        names = _header_names(next(rows, ()))
+        width = len(names)
+        chunk = []
+        blank = 0
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if all(v is None for v in row):
+                # Blank rows are only kept when data follows them, like pandas does
+                blank += 1
+                continue
+            chunk.extend([(None,) * width] * blank)
+            blank = 0
+            chunk.append(row)
+            if len(chunk) >= options['chunk_size']:
+                table = _chunk_to_arrow(chunk, names, writer.schema)
+                chunk = []
+                parsed = time.perf_counter()
+                parse_time += parsed - start
+                writer.write(table)
+                if head is None:
+                    head = table.slice(0, PREVIEW_ROWS).to_pandas()
+                rows_written += table.num_rows
+                if stats is not None:
+                    stats.update(table.to_pandas())
+                start = time.perf_counter()
+                write_time += start - parsed
+        if chunk or writer.schema is None:
+            table = _chunk_to_arrow(chunk, names, writer.schema)
+            parsed = time.perf_counter()
+            parse_time += parsed - start
+            writer.write(table)
+            if head is None:
+                head = table.slice(0, PREVIEW_ROWS).to_pandas()
+            rows_written += table.num_rows
+            if stats is not None:
+                stats.update(table.to_pandas())
+            start = time.perf_counter()
+            write_time += start - parsed
+        writer.close()
+        write_preview(make_preview(head, rows_written), output_dir, sheet)
+        if stats is not None:
+            write_stats(stats.result(), output_dir, sheet)
+        else:
+            remove_stats(output_dir, sheet)
+        write_time += time.perf_counter() - start
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        wb.close()
+
+    remove_other_formats(output_dir, sheet, options['formats'])
+    return sheet, parse_time, write_time
+
+
+def _convert_sheet(excel_path: str, sheet: str, output_dir: str, options: dict,
+                   xl: pd.ExcelFile = None) -> tuple:
+    """
+    Читает один лист Excel-файла и сохраняет его в форматах из `options['formats']`.
+
+    Выполняется как в основном процессе, так и в процессах пула,
+    поэтому при отсутствии `xl` открывает книгу самостоятельно.
+
+    Returns:
+        tuple: (имя листа, время чтения в секундах, время записи в секундах).
+    """
+    if options['stream']:
+        return _stream_sheet(excel_path, sheet, output_dir, options)
+
+    start = time.perf_counter()
+    if xl is None:
+        xl = pd.ExcelFile(excel_path)
+    df = xl.parse(sheet)
+    df.columns = df.columns.str.strip()
+    if options['compact']:
+        df = optimize_dtypes(df, label=f'{sheet}.')
+    parsed = time.perf_counter()
+
+    write_table(df, output_dir, sheet, options['formats'])
+    remove_other_formats(output_dir, sheet, options['formats'])
+    write_preview(make_preview(df), output_dir, sheet)
+    if options['stats']:
+        stats = StatsAccumulator()
+        stats.update(df)
+        write_stats(stats.result(), output_dir, sheet)
+    else:
+        remove_stats(output_dir, sheet)
+    written = time.perf_counter()
+    return sheet, parsed - start, written - parsed
+
+
+def _file_digest(path: str) -> str:
+    """
+    Считает SHA-256 всего файла.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _xml_segments(f, boundary: re.Pattern, block_size: int = 1 << 20):
+    """
+    Читает XML-файл из архива блоками и отдает куски, обрезанные сразу после
+    последнего совпадения `boundary`, чтобы ни один элемент не попал в два куска.
+    """
+    pending = b''
+    for block in iter(lambda: f.read(block_size), b''):
+        pending += block
+        cut = 0
+        for match in boundary.finditer(pending):
+            cut = match.end()
+        if cut:
+            yield pending[:cut]
+            pending = pending[cut:]
+    if pending:
+        yield pending
+
+
+def _sheet_fingerprints(excel_path: str, sheet_names: list) -> dict:
+    """
+    Вычисляет отпечаток содержимого каждого листа без разбора книги через pandas.
+
+    Для .xlsx хэшируются ячейки листа (<sheetData>), используемые ими общие
+    строки и стили, поэтому смена активной ячейки или масштаба листа не
+    приводит к пересборке.
+    Для остальных форматов отпечаток листа совпадает с хэшем всего файла.
+
+    Returns:
+        dict: {лист: отпечаток}.
+    """
+    if not zipfile.is_zipfile(excel_path):
+        digest = _file_digest(excel_path)
+        return {sheet: digest for sheet in sheet_names}
+
+    with zipfile.ZipFile(excel_path) as zf:
+        names = set(zf.namelist())
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {}
+        for rel in rels.iter(f'{_NS_PKG_REL}Relationship'):
+            target = rel.get('Target')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join('xl', target))
+            targets[rel.get('Id')] = target
+        parts = {
+            sheet.get('name'): targets.get(sheet.get(f'{_NS_REL}id'))
+            for sheet in workbook.iter(f'{_NS_MAIN}sheet')
+        }
+
+        # Shared strings are kept as digests and sheets are hashed block by block,
+        # so memory does not grow with the size of the workbook
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            with zf.open('xl/sharedStrings.xml') as f:
+                for segment in _xml_segments(f, _SHARED_STRING_END_RE):
+                    shared.extend(hashlib.sha256(si).digest() for si in _SHARED_STRING_RE.findall(segment))
+        styles = zf.read('xl/styles.xml') if 'xl/styles.xml' in names else b''
+
+        fingerprints = {}
+        for sheet in sheet_names:
+            digest = hashlib.sha256(styles)
+            strings = hashlib.sha256()
+            inside = None
+            with zf.open(parts[sheet]) as f:
+                for segment in _xml_segments(f, _CELL_END_RE):
+                    if inside is None:
+                        match = _SHEET_DATA_START_RE.search(segment)
+                        if not match:
+                            continue
+                        segment = segment[match.start():]
+                        inside = True
+                    match = _SHEET_DATA_END_RE.search(segment)
+                    if match:
+                        segment = segment[:match.end()]
+                    digest.update(segment)
+                    for ref in _SHARED_CELL_RE.findall(segment):
+                        i = int(ref)
+                        strings.update(shared[i] if i < len(shared) else ref)
+                    if match:
+                        break
+            digest.update(strings.digest())
+            fingerprints[sheet] = digest.hexdigest()
+    return fingerprints
+
+
+def _read_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(output_dir: str, manifest: dict) -> None:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_excel_to_pickle(excel_path: str = 'DZ_2.xlsx', output_dir: str = './data/', workers: int = 1,
+                         force: bool = False, formats: tuple = ('pickle',), compact: bool = False,
+                         stream: bool = False, chunk_size: int = 50000, stats: bool = False) -> dict:
     """
     Загружает все листы Excel-файла (кроме первого) и сохраняет каждый как .pkl-файл.
+
+    В папке `output_dir` ведется манифест с размером и временем изменения
+    Excel-файла и отпечатком каждого листа. Повторный запуск пересобирает
+    только новые и измененные листы и удаляет .pkl-файлы удаленных листов.
+    Рядом с каждым листом сохраняется предпросмотр (колонки, типы, число строк
+    и первые строки, см. storage.make_preview), который показывается без
+    чтения всего листа.
+
+    Parameters:
+        excel_path (str): Путь к Excel-файлу.
+        output_dir (str): Папка для .pkl-файлов.
+        workers (int): Количество процессов для параллельной обработки листов.
+            1 — последовательная обработка, None или 0 — по числу ядер.
+        force (bool): Пересобрать все листы, не глядя на манифест.
+        formats (tuple): Форматы хранения из storage.FORMATS. 'parquet' добавляет
+            колоночную копию листа, из которой можно читать отдельные колонки,
+            'feather' — копию, которая открывается через отображение в память.
+        compact (bool): Уплотнить типы колонок перед сохранением (см. optimize_dtypes).
+        stream (bool): Потоковый режим для листов, не помещающихся в память:
+            строки читаются частями по `chunk_size` и дописываются в колоночные
+            файлы. .pkl-файлы в этом режиме не создаются; если среди `formats`
+            нет колоночных, используется Parquet.
+        chunk_size (int): Количество строк в одной части для потокового режима.
+        stats (bool): Сохранить рядом с листом статистику колонок (частоты значений,
+            пустые ячейки, минимум и максимум, см. column_stats), чтобы диаграммы
+            и фильтры не читали колонку целиком.
+
+    Returns:
+        dict: Время обработки пересобранных листов: {лист: (чтение, запись)} в секундах.
     """
     os.makedirs(output_dir, exist_ok=True)
 
-    xl = pd.ExcelFile(excel_path)
-    sheet_names = xl.sheet_names[1:]
+    stat = os.stat(excel_path)
+    source = os.path.abspath(excel_path)
+    manifest = _read_manifest(output_dir)
+    if manifest.get('source') != source:
+        manifest = {}
+    old_sheets = manifest.get('sheets', {})
+    formats = tuple(formats)
+    if stream:
+        formats = tuple(fmt for fmt in formats if fmt in COLUMNAR_FORMATS) or ('parquet',)
+        compact = False
+    options = {'formats': list(formats), 'compact': compact, 'stream': stream, 'chunk_size': chunk_size,
+               'stats': stats}
+    rebuild = force or manifest.get('options') != options
+
+    def is_built(sheet):
+        if stats and not os.path.isfile(stats_path(table_path(output_dir, sheet, formats[0]))):
+            return False
+        if not os.path.isfile(preview_path(table_path(output_dir, sheet, formats[0]))):
+            return False
+        return all(os.path.isfile(table_path(output_dir, sheet, fmt)) for fmt in formats)
+
+    if (not rebuild and old_sheets
+            and manifest.get('mtime') == stat.st_mtime and manifest.get('size') == stat.st_size
+            and all(is_built(sheet) for sheet in old_sheets)):
+        print("[=] Excel-файл не изменился, пересборка не требуется.")
+        return {}
+
+    if stream:
+        # pd.ExcelFile is not needed for streaming and would hold the workbook in memory
+        from openpyxl import load_workbook
+        xl = None
+        wb = load_workbook(excel_path, read_only=True)
+        sheet_names = wb.sheetnames[1:]
+        wb.close()
+    else:
+        xl = pd.ExcelFile(excel_path)
+        sheet_names = xl.sheet_names[1:]
     if not sheet_names:
         raise ValueError("Excel-файл не содержит листов кроме первого.")
 
+    fingerprints = _sheet_fingerprints(excel_path, sheet_names)
+    changed = [
+        sheet for sheet in sheet_names
+        if rebuild or old_sheets.get(sheet) != fingerprints[sheet] or not is_built(sheet)
+    ]
     for sheet in sheet_names:
-        df = xl.parse(sheet)
-        df.columns = df.columns.str.strip()
-        file_path = os.path.join(output_dir, f'{sheet}.pkl')
-        df.to_pickle(file_path)
-        print(f"[✓] Сохранено: {sheet}.pkl")
+        if sheet not in changed:
+            print(f"[=] Без изменений: {sheet}")
+
+    for sheet in old_sheets:
+        if sheet not in fingerprints:
+            remove_table(output_dir, sheet)
+            remove_stats(output_dir, sheet)
+            print(f"[-] Удалено: {sheet}")
+
+    if not workers:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(changed)))
+
+    timings = {}
+    if workers == 1:
+        for sheet in changed:
+            _, parse_time, write_time = _convert_sheet(excel_path, sheet, output_dir, options, xl)
+            timings[sheet] = (parse_time, write_time)
+            print(f"[✓] Сохранено: {sheet} ({', '.join(formats)}; чтение {parse_time:.2f} с, запись {write_time:.2f} с)")
+    else:
+        if xl is not None:
+            xl.close()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_convert_sheet, excel_path, sheet, output_dir, options) for sheet in changed]
+            for future in as_completed(futures):
+                sheet, parse_time, write_time = future.result()
+                timings[sheet] = (parse_time, write_time)
+                print(f"[✓] Сохранено: {sheet} ({', '.join(formats)}; чтение {parse_time:.2f} с, запись {write_time:.2f} с)")
+
+    _write_manifest(output_dir, {
+        'source': source,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'options': options,
+        'sheets': fingerprints,
+    })
+    return timings
 
 
 if __name__ == "__main__":
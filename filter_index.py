@@ -0,0 +1,414 @@
+import sys
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+
+class Condition:
+    """
+    Условие фильтра по одной колонке для FilterIndex.lookup.
+
+    kind:
+        'in' — значение входит в `values`;
+        'not_in' — значение не входит в `values`;
+        'range' — low <= значение <= high в исходном типе колонки
+            (None — граница не задана, пустые ячейки не подходят).
+
+    Значения для 'in' и 'not_in' сравниваются в строковом виде, как в индексе.
+    """
+
+    KINDS = ('in', 'not_in', 'range')
+
+    def __init__(self, kind: str, values=(), low=None, high=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестный вид условия: {kind}")
+        if kind != 'range' and not values:
+            raise ValueError("Не заданы значения для условия.")
+        if kind == 'range' and low is None and high is None:
+            raise ValueError("Не заданы границы диапазона.")
+        self.kind = kind
+        self.values = [str(v) for v in values]
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        if self.kind == 'range':
+            return f"Condition('range', low={self.low!r}, high={self.high!r})"
+        return f"Condition({self.kind!r}, {self.values!r})"
+
+
+def isin(values) -> Condition:
+    return Condition('in', values)
+
+
+def not_in(values) -> Condition:
+    return Condition('not_in', values)
+
+
+def between(low=None, high=None) -> Condition:
+    return Condition('range', low=low, high=high)
+
+
+def condition_from_spec(spec) -> Condition:
+    """
+    Строит условие из описания в JSON-виде:
+    значение — равенство, список — одно из значений,
+    {"not": [...]} — ни одно из значений, {"min": ..., "max": ...} — диапазон.
+    """
+    if isinstance(spec, dict):
+        if 'not' in spec:
+            values = spec['not']
+            return not_in(values if isinstance(values, list) else [values])
+        if 'min' in spec or 'max' in spec:
+            return between(spec.get('min'), spec.get('max'))
+        raise ValueError(f"Непонятное условие фильтра: {spec}")
+    if isinstance(spec, list):
+        return isin(spec)
+    return isin([spec])
+
+
+def parse_condition(text: str) -> Condition:
+    """
+    Разбирает условие, введенное как текст:
+    'a' — равенство, 'a|b' — одно из значений, '!a|b' — ни одно из значений,
+    '10..20', '10..' или '..20' — диапазон.
+    """
+    text = text.strip()
+    if text.startswith('!'):
+        return not_in([v.strip() for v in text[1:].split('|')])
+    if '..' in text:
+        low, high = (part.strip() or None for part in text.split('..', 1))
+        return between(low, high)
+    return isin([v.strip() for v in text.split('|')])
+
+
+def coerce_bound(values: np.ndarray, bound, col):
+    """
+    Приводит границу диапазона к типу значений колонки (см. range_values).
+
+    Raises:
+        ValueError: Границу нельзя привести к типу колонки.
+    """
+    try:
+        if values.dtype.kind in 'iuf':
+            return float(bound)
+        if values.dtype.kind == 'M':
+            return np.datetime64(pd.Timestamp(bound).tz_localize(None), 'ns').astype(values.dtype)
+        if values.dtype.kind == 'm':
+            return np.timedelta64(pd.Timedelta(bound), 'ns').astype(values.dtype)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Неверная граница диапазона для '{col}': {e}")
+    return str(bound) if isinstance(bound, str) else bound
+
+
+# Approximate size of one entry in a pandas hash table over the values (buckets and flags).
+HASH_ENTRY_BYTES = 32
+
+
+def _object_bytes(values) -> int:
+    """
+    Оценивает объем памяти значений как объектов Python (ссылка и сама строка):
+    столько занимают список различных значений и массивы с dtype=object.
+    """
+    lengths = pd.Series(values).str.len()
+    return len(values) * (8 + sys.getsizeof('')) + int(lengths.sum())
+
+
+def _plain(series: pd.Series) -> pd.Series:
+    """
+    Переводит колонку с типом pd.ArrowDtype (Feather-копия, отображенная
+    в память) в обычные типы pandas, как при чтении .pkl- или Parquet-файла.
+
+    Иначе строковый вид значений расходился бы со статистикой колонок
+    и прочитанными другими путями таблицами: например, дата в ArrowDtype
+    превращается в '2020-01-01 00:00:00', а в datetime64 — в '2020-01-01'.
+    """
+    if not isinstance(series.dtype, pd.ArrowDtype):
+        return series
+    import pyarrow as pa
+    plain = pa.chunked_array(series.array.__arrow_array__()).to_pandas()
+    plain.index = series.index
+    plain.name = series.name
+    return plain
+
+
+def text_codes(raw: pd.Series) -> tuple:
+    """
+    Кодирует ячейки колонки по их строковому виду, как в `df[col].astype(str)`.
+    У колонок с типом в строку переводятся только различные значения.
+
+    Returns:
+        tuple: (коды ячеек, np.ndarray строковых значений по кодам).
+    """
+    raw = _plain(raw)
+    if raw.dtype == object:
+        return pd.factorize(raw.astype(str), use_na_sentinel=False)
+    codes, uniques = pd.factorize(raw, use_na_sentinel=False)
+    text_codes, uniques = pd.factorize(pd.Series(uniques).astype(str), use_na_sentinel=False)
+    return text_codes[codes], uniques
+
+
+def range_values(raw: pd.Series) -> tuple:
+    """
+    Готовит колонку к сравнению с границами диапазона: категории
+    сравниваются в типе самих категорий, пустые ячейки отбрасываются.
+
+    Returns:
+        tuple: (np.ndarray непустых значений, булев массив непустых ячеек).
+    """
+    raw = _plain(raw)
+    if isinstance(raw.dtype, pd.CategoricalDtype):
+        raw = raw.astype(raw.cat.categories.dtype)
+    notna = raw.notna().to_numpy()
+    return raw[notna].to_numpy(), notna
+
+
+class ValueIndex:
+    """
+    Индекс значений одной колонки в сжатом виде: номера строк, упорядоченные
+    по значению (`order`), и границы группы каждого значения (`offsets`),
+    как в join_index.KeyIndex. Значение — строковое представление ячейки,
+    как в `df[col].astype(str)`; на каждое значение не создается отдельного
+    массива, поэтому индекс колонки с миллионами различных значений занимает
+    несколько массивов чисел и одну хэш-таблицу (pd.Index).
+    """
+
+    def __init__(self, raw: pd.Series):
+        codes, uniques = text_codes(raw)
+        dtype = np.int32 if len(codes) < np.iinfo(np.int32).max else np.int64
+        self.uniques = pd.Index(uniques)
+        self.order = np.argsort(codes, kind='stable').astype(dtype)
+        counts = np.bincount(codes, minlength=len(uniques))
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(dtype)
+        # Values that occur in at least one non-empty cell, for distinct()
+        self.present = np.bincount(codes[raw.notna().to_numpy()], minlength=len(uniques)) > 0
+        self.rows = len(codes)
+        self.text_bytes = _object_bytes(self.uniques)
+        self.hashed = False
+
+    def positions(self, value) -> np.ndarray:
+        """
+        Возвращает отсортированные позиции строк со значением `value`.
+        """
+        i = self.uniques.get_indexer([value])[0]
+        self.hashed = True
+        if i < 0:
+            return np.empty(0, dtype=self.order.dtype)
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    def distinct(self) -> list:
+        """
+        Возвращает отсортированный список различных непустых значений.
+        """
+        return sorted(self.uniques[self.present].tolist())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Приблизительный объем памяти индекса: массивы позиций, различные
+        значения как строки Python и хэш-таблица, если она уже построена.
+        """
+        total = self.order.nbytes + self.offsets.nbytes + self.present.nbytes + self.text_bytes
+        if self.hashed:
+            total += len(self.uniques) * HASH_ENTRY_BYTES
+        return total
+
+
+class FilterIndex:
+    """
+    Индекс значений колонок для фильтрации.
+
+    Для каждой колонки один раз строится ValueIndex: позиции строк,
+    сгруппированные по строковому представлению ячейки, как в `df[col].astype(str)`.
+    Фильтр по нескольким колонкам сводится к пересечению массивов позиций.
+    Индекс колонки строится при первом обращении к ней; отсортированный
+    список различных значений колонки составляется при первом запросе.
+    Для диапазонов отдельно строится индекс из отсортированных значений
+    колонки в исходном типе, по которому границы ищутся двоичным поиском.
+    Методы можно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, load_column):
+        """
+        Parameters:
+            load_column (callable): Функция, возвращающая pd.Series по имени колонки.
+        """
+        self._load_column = load_column
+        self._columns = {}
+        self._distinct = {}
+        self._ranges = {}
+        self._range_bytes = {}
+        self._rows = None
+        self._lock = threading.Lock()
+
+    def _build(self, col) -> None:
+        index = ValueIndex(self._load_column(col))
+        self._rows = index.rows
+        # _columns is filled last: it is what marks the column as built
+        self._columns[col] = index
+
+    def _build_range(self, col) -> None:
+        raw = _plain(self._load_column(col))
+        if isinstance(raw.dtype, pd.CategoricalDtype):
+            raw = raw.astype(raw.cat.categories.dtype)
+        values, notna = range_values(raw)
+        try:
+            order = np.argsort(values, kind='stable')
+        except TypeError:
+            raise ValueError(f"Колонка '{col}' содержит несравнимые значения, диапазон по ней задать нельзя.")
+        self._rows = len(raw)
+        values, positions = values[order], np.flatnonzero(notna)[order]
+        # An object column's array shares the frame's str objects; other dtypes convert to new ones
+        fresh_objects = values.dtype == object and raw.dtype != object
+        self._range_bytes[col] = positions.nbytes + (_object_bytes(values) if fresh_objects else values.nbytes)
+        self._ranges[col] = (values, positions)
+
+    def is_built(self, col) -> bool:
+        """
+        Проверяет, построен ли уже индекс колонки.
+        """
+        return col in self._columns
+
+    def has_distinct(self, col) -> bool:
+        """
+        Проверяет, составлен ли уже список различных значений колонки
+        (тогда distinct() возвращается сразу).
+        """
+        return col in self._distinct
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Приблизительный объем памяти построенных индексов: индексы значений
+        (см. ValueIndex.nbytes), списки различных значений и индексы диапазонов.
+        """
+        total = sum(index.nbytes for index in list(self._columns.values()))
+        for col in list(self._distinct):
+            # sorted() makes a new list of new str objects, about the size of the index's values
+            total += self._columns[col].text_bytes
+        return total + sum(list(self._range_bytes.values()))
+
+    def covers(self, criteria: dict) -> bool:
+        """
+        Проверяет, можно ли выполнить фильтр по уже построенным индексам,
+        не читая колонки.
+        """
+        for col, condition in criteria.items():
+            if isinstance(condition, Condition) and condition.kind == 'range':
+                if col not in self._ranges:
+                    return False
+            elif col not in self._columns:
+                return False
+        return True
+
+    def column(self, col) -> ValueIndex:
+        """
+        Возвращает индекс колонки, строя его при первом обращении.
+        """
+        if col not in self._columns:
+            with self._lock:
+                if col not in self._columns:
+                    self._build(col)
+        return self._columns[col]
+
+    def distinct(self, col) -> list:
+        """
+        Возвращает отсортированный список различных непустых значений колонки.
+
+        Совпадает с `sorted(df[col].dropna().astype(str).unique())`.
+        """
+        index = self.column(col)
+        if col not in self._distinct:
+            self._distinct[col] = index.distinct()
+        return self._distinct[col]
+
+    def positions(self, col, value) -> np.ndarray:
+        """
+        Возвращает позиции строк, в которых `col` равно `value`.
+        """
+        return self.column(col).positions(value)
+
+    def range_positions(self, col, low=None, high=None) -> np.ndarray:
+        """
+        Возвращает отсортированные позиции строк, в которых low <= `col` <= high.
+        """
+        if col not in self._ranges:
+            with self._lock:
+                if col not in self._ranges:
+                    self._build_range(col)
+        values, positions = self._ranges[col]
+        start, stop = 0, len(values)
+        try:
+            if low is not None:
+                start = np.searchsorted(values, coerce_bound(values, low, col), side='left')
+            if high is not None:
+                stop = np.searchsorted(values, coerce_bound(values, high, col), side='right')
+        except TypeError as e:
+            raise ValueError(f"Неверная граница диапазона для '{col}': {e}")
+        return np.sort(positions[start:max(start, stop)])
+
+    def condition_positions(self, col, condition: Condition) -> np.ndarray:
+        """
+        Возвращает отсортированные позиции строк, для которых `condition`
+        истинно ('not_in' — позиции строк, которые нужно исключить).
+        """
+        if condition.kind == 'range':
+            return self.range_positions(col, condition.low, condition.high)
+        arrays = [self.positions(col, value) for value in dict.fromkeys(condition.values)]
+        if len(arrays) == 1:
+            return arrays[0]
+        # Positions of different values never overlap, so the union is just sorted
+        return np.sort(np.concatenate(arrays))
+
+    def lookup(self, criteria: dict) -> np.ndarray:
+        """
+        Возвращает отсортированные позиции строк, удовлетворяющих всем критериям.
+
+        Parameters:
+            criteria (dict): {колонка: значение или Condition}. Значение
+                означает равенство; условия по разным колонкам объединяются через И.
+        """
+        if not criteria:
+            raise ValueError("Не заданы критерии фильтрации.")
+        include, exclude = [], []
+        for col, condition in criteria.items():
+            if not isinstance(condition, Condition):
+                condition = isin([condition])
+            positions = self.condition_positions(col, condition)
+            (exclude if condition.kind == 'not_in' else include).append(positions)
+
+        if include:
+            include.sort(key=len)
+            result = include[0]
+            for positions in include[1:]:
+                if not len(result):
+                    break
+                result = np.intersect1d(result, positions, assume_unique=True)
+        else:
+            result = np.arange(self._rows)
+        for positions in exclude:
+            if not len(result):
+                break
+            result = np.setdiff1d(result, positions, assume_unique=True)
+        return result
+
+
+_frame_indexes = {}
+
+
+def frame_index(df: pd.DataFrame) -> FilterIndex:
+    """
+    Возвращает индекс для DataFrame, создавая его при первом вызове.
+
+    Индекс хранится, пока жив сам DataFrame, поэтому повторные отчеты
+    по той же таблице не пересчитывают его.
+    """
+    key = id(df)
+    index = _frame_indexes.get(key)
+    if index is None:
+        ref = weakref.ref(df)
+        index = FilterIndex(lambda col: ref()[col])
+        _frame_indexes[key] = index
+        weakref.finalize(df, _frame_indexes.pop, key, None)
+    return index
@@ -1,5 +1,9 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from column_stats import count_values, top_values
+from filter_index import frame_index, parse_condition
+from result_cache import cached_pivot_table
+from scatter_data import draw_scatter, prepare_scatter
 
 def choose_columns_by_index(columns: list, count: int = None) -> list:
     """
@@ -38,21 +42,28 @@ def generate_text_report(df: pd.DataFrame):
     if not filter_cols:
         return
 
+    print("Условие: значение; несколько значений через '|'; '!' в начале — исключить значения; "
+          "'от..до' — диапазон (любую границу можно опустить).")
     criteria = {}
     for col in filter_cols:
-        val = input(f"Введите значение для фильтрации по '{col}': ").strip()
-        criteria[col] = val
+        text = input(f"Введите условие для фильтрации по '{col}': ")
+        try:
+            criteria[col] = parse_condition(text)
+        except ValueError as e:
+            print(f"Ошибка в условии: {e}")
+            return
 
     print("\nВыберите колонки для отображения в отчете:")
     selected_columns = choose_columns_by_index(df.columns.tolist())
     if not selected_columns:
         return
 
-    mask = pd.Series(True, index=df.index)
-    for col, val in criteria.items():
-        mask &= df[col].astype(str) == val
-
-    result = df.loc[mask, selected_columns]
+    try:
+        positions = frame_index(df).lookup(criteria)
+    except ValueError as e:
+        print(f"Ошибка фильтрации: {e}")
+        return
+    result = df[selected_columns].iloc[positions]
     print("\nРезультат отчета:")
     if result.empty:
         print("Нет данных, соответствующих заданным фильтрам.")
@@ -63,6 +74,9 @@ def generate_text_report(df: pd.DataFrame):
 def generate_scatter_plot(df: pd.DataFrame):
     """
     Строит scatter-график по любым двум колонкам (не обязательно числовым).
+
+    Для больших таблиц вместо точек строится карта плотности или выборка
+    (см. scatter_data.prepare_scatter).
     """
     print("\nВыберите колонку X:")
     x_col = choose_columns_by_index(df.columns.tolist(), 1)
@@ -77,11 +91,18 @@ def generate_scatter_plot(df: pd.DataFrame):
     y = y_col[0]
 
     try:
-        df.plot.scatter(x=x, y=y)
-        plt.title(f"{y} от {x}")
-        plt.grid(True)
+        prepared = prepare_scatter(df, x, y)
+        fig, ax = plt.subplots()
+        draw_scatter(ax, prepared, x, y)
+        if prepared['kind'] == 'density':
+            plt.title(f"{y} от {x} (плотность, строк: {prepared['total']})")
+        elif len(prepared['data']) < prepared['total']:
+            plt.title(f"{y} от {x} (выборка {len(prepared['data'])} из {prepared['total']})")
+        else:
+            plt.title(f"{y} от {x}")
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
     except Exception as e:
         print(f"Ошибка при построении scatter-графика: {e}")
 
@@ -89,6 +110,8 @@ def generate_scatter_plot(df: pd.DataFrame):
 def generate_pie_chart(df: pd.DataFrame):
     """
     Строит круговую диаграмму по значениям в выбранной колонке.
+
+    Показываются TOP_N самых частых значений, остальные объединяются в «Прочие».
     """
     print("\nВыберите колонку для круговой диаграммы:")
     selected = choose_columns_by_index(df.columns.tolist(), 1)
@@ -96,10 +119,12 @@ def generate_pie_chart(df: pd.DataFrame):
         return
     col = selected[0]
 
-    value_counts = df[col].value_counts()
+    value_counts = count_values(df[col])
     if value_counts.empty:
         print("Нет данных для диаграммы.")
         return
+    # Rare values are merged so the chart has at most TOP_N + 1 elements
+    value_counts = top_values(value_counts, other_label='Прочие')
 
     plt.figure(figsize=(8, 8))
     value_counts.plot.pie(autopct='%1.1f%%', startangle=360, shadow=True)
@@ -107,11 +132,14 @@ def generate_pie_chart(df: pd.DataFrame):
     plt.ylabel('')
     plt.tight_layout()
     plt.show()
+    plt.close()
 
 
 def generate_bar_chart(df: pd.DataFrame):
     """
     Строит столбчатую диаграмму по количеству значений в выбранной колонке.
+
+    Показываются TOP_N самых частых значений, остальные объединяются в «Прочие».
     """
     print("\nВыберите колонку для столбчатой диаграммы:")
     selected = choose_columns_by_index(df.columns.tolist(), 1)
@@ -119,16 +147,19 @@ def generate_bar_chart(df: pd.DataFrame):
         return
     col = selected[0]
 
-    value_counts = df[col].value_counts()
+    value_counts = count_values(df[col])
     if value_counts.empty:
         print("Нет данных для диаграммы.")
         return
+    # Rare values are merged so the chart has at most TOP_N + 1 elements
+    value_counts = top_values(value_counts, other_label='Прочие')
 
     value_counts.plot.bar()
     plt.title(f'Распределение по колонке: {col}')
     plt.ylabel("Количество")
     plt.tight_layout()
     plt.show()
+    plt.close()
 
 def generate_pivot_report(df: pd.DataFrame) -> None:
     """
@@ -152,14 +183,7 @@ def generate_pivot_report(df: pd.DataFrame) -> None:
 
         agg = input("Введите функцию агрегации (sum, count, mean, size и т.д.): ").strip()
 
-        pivot = pd.pivot_table(
-            df,
-            index=columns[idx],
-            columns=columns[col],
-            values=values,
-            aggfunc=agg,
-            fill_value=0,
-        )
+        pivot = cached_pivot_table(df, columns[idx], columns[col], values, agg)
         print("\nСводная таблица:")
         print(pivot)
     except Exception as e:
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Интервал опроса памяти процесса во время операции, в секундах.
+SAMPLE_INTERVAL = 0.005
+
+
+def _windows_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def rss_mb():
+    """
+    Возвращает текущий объем памяти процесса (resident set) в МБ
+    или None, если его не узнать.
+
+    Linux — /proc/self/statm, Windows — GetProcessMemoryInfo. На остальных
+    системах возвращается пик за время жизни процесса (ru_maxrss).
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+        if sys.platform == 'win32':
+            size = _windows_rss()
+            return None if size is None else size / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other systems kilobytes
+    return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+class _MemorySampler(threading.Thread):
+    """
+    Опрашивает память процесса, пока идет операция, и запоминает максимум.
+
+    Память общая для процесса, поэтому у одновременно идущих операций
+    в пик попадает и чужое потребление.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_mb = rss_mb()
+        self.peak_mb = self.start_mb
+        self._done = threading.Event()
+
+    def _sample(self):
+        current = rss_mb()
+        if current is not None and (self.peak_mb is None or current > self.peak_mb):
+            self.peak_mb = current
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self._sample()
+
+    def finish(self):
+        self._done.set()
+        self.join()
+        self._sample()
+
+
+class Recorder:
+    """
+    Журнал длительности операций (загрузка, фильтрация, сводные таблицы,
+    диаграммы, загрузка Excel).
+
+    Для каждой операции запоминаются время выполнения, число обработанных
+    строк, пик памяти процесса во время операции (по опросу каждые
+    SAMPLE_INTERVAL секунд) и его прирост от начала операции, результат. Последние `keep`
+    записей хранятся в памяти для панели диагностики, все записи дописываются
+    в JSON-журнал с ротацией (`log_dir/timings.jsonl`). При включенном
+    `profile` каждая операция дополнительно профилируется через cProfile,
+    а статистика сохраняется в `log_dir/profiles/`.
+    Методы можно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, log_dir: str = './logs', keep: int = 500, max_bytes: int = 1024 * 1024, backups: int = 5):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.profile = False
+        self.records = deque(maxlen=keep)
+        self._logger = None
+        self._lock = threading.Lock()
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.log_dir, 'timings.jsonl')
+
+    def _log(self, record: dict) -> None:
+        if self._logger is None:
+            try:
+                os.makedirs(self.log_dir, exist_ok=True)
+                handler = RotatingFileHandler(self.log_path, maxBytes=self.max_bytes,
+                                              backupCount=self.backups, encoding='utf-8')
+            except OSError:
+                return
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger(f'{__name__}.{id(self)}')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+            self._logger = logger
+        self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def measure(self, operation: str, **details):
+        """
+        Замеряет операцию внутри блока with.
+
+        Блок получает словарь записи и может дополнить его, например
+        `record['rows'] = len(df)` (обработано строк) и `record['result_rows']`.
+        Исключения записываются со статусом 'error' и пробрасываются дальше.
+        """
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'operation': operation,
+            'rows': None,
+            'result_rows': None,
+            'details': details,
+        }
+        profiler = cProfile.Profile() if self.profile else None
+        sampler = _MemorySampler()
+        sampler.start()
+        start = time.perf_counter()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler: skip it for overlapping operations
+                profiler = None
+        try:
+            yield record
+            record['status'] = 'ok'
+        except BaseException as e:
+            record['status'] = 'error'
+            record['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['seconds'] = round(time.perf_counter() - start, 6)
+            sampler.finish()
+            if sampler.peak_mb is not None:
+                record['peak_rss_mb'] = round(sampler.peak_mb, 1)
+            if sampler.peak_mb is not None and sampler.start_mb is not None:
+                record['peak_growth_mb'] = round(sampler.peak_mb - sampler.start_mb, 1)
+            if profiler is not None:
+                record['profile'] = self._save_profile(profiler, operation)
+            with self._lock:
+                self.records.append(record)
+                self._log(record)
+
+    def _save_profile(self, profiler, operation: str):
+        folder = os.path.join(self.log_dir, 'profiles')
+        path = os.path.join(folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{operation}-{threading.get_ident()}.prof")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError:
+            return None
+        return path
+
+    def snapshot(self) -> list:
+        """
+        Возвращает копию записей, хранящихся в памяти (от старых к новым).
+        """
+        with self._lock:
+            return list(self.records)
+
+
+recorder = Recorder()
@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import pandas as pd
+from result_cache import LRUCache, dataset_fingerprint
+from storage import read_table
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _key_values(series: pd.Series, as_text: bool) -> pd.Series:
+    """
+    Готовит значения ключа к сравнению: числа сравниваются как числа,
+    а если хотя бы одна сторона нечисловая — обе стороны сравниваются как строки
+    (в Excel-справочниках один и тот же код часто хранится то числом, то текстом).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.dtype.categories.dtype)
+    if as_text:
+        text = series.astype(str).str.strip()
+        return text.where(series.notna())
+    return series.astype('float64')
+
+
+class KeyIndex:
+    """
+    Хэш-индекс ключевой колонки справочника для соединения таблиц.
+
+    Хранит хэш-таблицу различных значений ключа (pd.Index, хэш-таблица
+    строится один раз) и позиции строк для каждого значения, поэтому
+    повторные соединения с тем же справочником не хэшируют его заново.
+    """
+
+    def __init__(self, keys: pd.Series):
+        codes, uniques = pd.factorize(keys)
+        self.uniques = pd.Index(uniques)
+        valid = codes >= 0
+        self.counts = np.bincount(codes[valid], minlength=len(uniques))
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+        self.order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        self.rows = len(keys)
+        # Build the hash table now, while still in a background thread
+        self.uniques.get_indexer(self.uniques[:1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.uniques.memory_usage(deep=True) + self.counts.nbytes + self.starts.nbytes + self.order.nbytes)
+
+    def match(self, keys: pd.Series, as_text: bool, how: str = 'left') -> tuple:
+        """
+        Сопоставляет значения ключа левой таблицы строкам справочника.
+
+        Левая колонка сначала кодируется в исходном типе, и к виду ключа
+        справочника (см. _key_values) приводятся только ее различные значения.
+
+        Returns:
+            tuple: (позиции левой таблицы, позиции справочника); для строк без
+            пары при how='left' позиция справочника равна -1.
+        """
+        left_codes, left_uniques = pd.factorize(keys)
+        unique_codes = self.uniques.get_indexer(_key_values(pd.Series(left_uniques), as_text))
+        # Empty cells have code -1, which picks the appended "not found" entry
+        codes = np.append(unique_codes, -1)[left_codes]
+        found = codes >= 0
+        # The reference sheet may have no keys at all (header only or blank key column)
+        counts = np.zeros(len(codes), dtype=np.int64)
+        counts[found] = self.counts[codes[found]]
+        if how == 'left':
+            counts = np.maximum(counts, 1)
+        elif how != 'inner':
+            raise ValueError(f"Неизвестный вид соединения: {how}")
+        left = np.repeat(np.arange(len(keys)), counts)
+        # Position inside each group: 0, 1, ... counts[i] - 1 for every left row
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        within = np.arange(len(left)) - first
+        left_codes = codes[left]
+        right = np.full(len(left), -1, dtype=np.int64)
+        matched = left_codes >= 0
+        right[matched] = self.order[self.starts[left_codes[matched]] + within[matched]]
+        return left, right
+
+
+key_index_cache = LRUCache(256 * 1024 * 1024)
+
+
+def key_index(path: str, col, as_text: bool, keys: pd.Series = None) -> KeyIndex:
+    """
+    Возвращает индекс ключевой колонки справочника из кэша или строит его.
+
+    Индекс привязан к отпечатку файла (см. dataset_fingerprint): после
+    перезаписи справочника он строится заново.
+
+    Parameters:
+        keys (pd.Series): Уже загруженная колонка ключа; без нее колонка
+            читается из файла.
+    """
+    dataset = dataset_fingerprint(path)
+    key_index_cache.invalidate(lambda key: key[0][0] == dataset[0] and key[0] != dataset)
+    cache_key = (dataset, col, as_text)
+    index = key_index_cache.get(cache_key)
+    if index is None:
+        if keys is None:
+            keys = read_table(path, [col])[col]
+        index = KeyIndex(_key_values(keys, as_text))
+        key_index_cache.put(cache_key, index)
+    return index
+
+
+def join_tables(base: pd.DataFrame, joins: list, token=None) -> pd.DataFrame:
+    """
+    Последовательно присоединяет к таблице `base` другие справочники.
+
+    Parameters:
+        base (pd.DataFrame): Левая таблица.
+        joins (list): Список словарей
+            {'path': путь к справочнику, 'left_on': колонка результата,
+             'right_on': колонка справочника, 'columns': присоединяемые колонки
+             (None — все, кроме ключа), 'how': 'left' или 'inner',
+             'suffix': окончание для совпадающих имен колонок}.
+            Каждое следующее соединение может использовать колонки,
+            присоединенные предыдущими.
+        token: Объект с атрибутом `cancelled`; при отмене возвращается None.
+
+    Returns:
+        pd.DataFrame: Результат соединения; индекс — номера строк `base`.
+    """
+    result = base.reset_index(drop=True)
+    positions = np.arange(len(base))
+    for join in joins:
+        if token is not None and token.cancelled:
+            return None
+        path, left_on, right_on = join['path'], join['left_on'], join['right_on']
+        columns = join.get('columns')
+        right = read_table(path, None if columns is None else list(dict.fromkeys([right_on] + list(columns))))
+        if columns is None:
+            columns = [col for col in right.columns if col != right_on]
+        left_keys = result[left_on]
+        as_text = not (_is_numeric(left_keys) and _is_numeric(right[right_on]))
+        index = key_index(path, right_on, as_text, right[right_on])
+
+        left_rows, right_rows = index.match(left_keys, as_text, join.get('how', 'left'))
+        joined = result.iloc[left_rows].reset_index(drop=True)
+        suffix = join.get('suffix') or f" ({os.path.splitext(os.path.basename(path))[0]})"
+        for col in columns:
+            # Unmatched rows carry -1, which reindex turns into empty cells
+            values = right[col].reset_index(drop=True).reindex(right_rows).reset_index(drop=True)
+            name = col if col not in joined.columns else f'{col}{suffix}'
+            joined[name] = values
+        result = joined
+        positions = positions[left_rows]
+    result.index = positions
+    return result
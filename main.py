@@ -1,13 +1,18 @@
 import os
+import sys
+import startup
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from db_loader import load_excel_to_pickle
-from generate_reports import generate_pivot_report
+from table_view import DataFrameView
+from task_runner import TaskRunner
 import threading
 
+# pandas, matplotlib and the modules built on them are imported on first use
+# (and preloaded in the background once the main menu is shown), so the window
+# appears without waiting for them. Run with --startup-times for a breakdown.
+
+FILTER_MODES = ('is one of', 'is not one of', 'between')
+
 class DataApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -44,15 +49,40 @@ class DataApp(tk.Tk):
         self.current_theme = "light"
 
         self.data_dir = "./data"
-        self.df = None
+        self.df_path = None
+        self.df_columns = []
+        self.df_stats = None
+        self.filter_index = None
+        self.dataset = None
+        self.session = None
         self.pkl_files = []
         self.filter_columns = []
         self.filter_values = {}
         self.selected_display_columns = []
+        self.tasks = TaskRunner(self, on_status=self.show_task_status)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.tabs_built = set()
+        self.pkl_combo = None
+        self.task_progress = None
 
         self.create_widgets()
         self.create_theme_toggle()
         self.apply_theme()
+        startup.mark("window built")
+        self.after_idle(lambda: startup.mark("main menu shown"))
+        self.after(100, self.preload_modules)
+
+    def preload_modules(self):
+        def run():
+            startup.preload()
+            if '--startup-times' in sys.argv:
+                print(startup.report())
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_close(self):
+        self.tasks.shutdown()
+        self.destroy()
 
     def create_widgets(self):
         # Create main menu frame
@@ -64,20 +94,21 @@ class DataApp(tk.Tk):
         ttk.Button(self.main_menu_frame, text="Load Data", command=self.show_load_tab).pack(pady=10, ipadx=10, ipady=5)
         ttk.Button(self.main_menu_frame, text="Select Data", command=self.show_select_tab).pack(pady=10, ipadx=10, ipady=5)
         ttk.Button(self.main_menu_frame, text="Generate Report", command=self.show_report_tab).pack(pady=10, ipadx=10, ipady=5)
+        ttk.Button(self.main_menu_frame, text="Diagnostics", command=lambda: DiagnosticsDialog(self)).pack(pady=10, ipadx=10, ipady=5)
 
-        # Create frames for each section but do not pack yet
+        # Create frames for each section; their contents are built on first show
         self.tab_load = ttk.Frame(self, padding=20)
         self.tab_select = ttk.Frame(self, padding=20)
         self.tab_report = ttk.Frame(self, padding=10)
 
-        self.create_load_tab()
-        self.create_select_tab()
-        self.create_report_tab()
-
-        # Initially hide all section frames
-        self.tab_load.pack_forget()
-        self.tab_select.pack_forget()
-        self.tab_report.pack_forget()
+    def ensure_tab(self, name):
+        if name in self.tabs_built:
+            return
+        builders = {'load': self.create_load_tab, 'select': self.create_select_tab, 'report': self.create_report_tab}
+        builders[name]()
+        self.tabs_built.add(name)
+        startup.mark(f"{name} tab built")
+        self.apply_theme()
 
     def show_main_menu(self):
         self.main_menu_frame.pack(fill='both', expand=True)
@@ -86,16 +117,19 @@ class DataApp(tk.Tk):
         self.tab_report.pack_forget()
 
     def show_load_tab(self):
+        self.ensure_tab('load')
         self.main_menu_frame.pack_forget()
         self.tab_load.pack(fill='both', expand=True)
         self.add_back_button(self.tab_load)
 
     def show_select_tab(self):
+        self.ensure_tab('select')
         self.main_menu_frame.pack_forget()
         self.tab_select.pack(fill='both', expand=True)
         self.add_back_button(self.tab_select)
 
     def show_report_tab(self):
+        self.ensure_tab('report')
         self.main_menu_frame.pack_forget()
         self.tab_report.pack(fill='both', expand=True)
         self.add_back_button(self.tab_report)
@@ -110,82 +144,6 @@ class DataApp(tk.Tk):
         back_btn.is_back_button = True
         back_btn.pack(anchor='ne', pady=5, padx=5)
 
-    def update_filter_value_entries(self):
-        # Clear previous entries
-        for widget in self.filter_values_container.winfo_children():
-            widget.destroy()
-        self.filter_entries.clear()
-
-        selected_indices = self.filter_listbox.curselection()
-        for idx in selected_indices:
-            col = self.filter_listbox.get(idx)
-            label = ttk.Label(self.filter_values_container, text=f"Values for {col}:")
-            label.pack(anchor='w', padx=5, pady=2)
-
-            # Create listbox with unique values from dataframe column for multiple selection
-            values = []
-            if self.df is not None and col in self.df.columns:
-                values = sorted(self.df[col].dropna().astype(str).unique().tolist())
-            listbox = tk.Listbox(self.filter_values_container, selectmode='multiple', exportselection=0, height=min(10, len(values)))
-            for val in values:
-                listbox.insert(tk.END, val)
-            listbox.pack(fill='x', padx=5, pady=2)
-            self.filter_entries[col] = listbox
-
-        selected_indices = self.filter_listbox.curselection()
-        for idx in selected_indices:
-            col = self.filter_listbox.get(idx)
-            label = ttk.Label(self.filter_values_container, text=f"Value for {col}:")
-            label.pack(anchor='w', padx=5, pady=2)
-
-            # Create combobox with unique values from dataframe column
-            values = []
-            if self.df is not None and col in self.df.columns:
-                values = sorted(self.df[col].dropna().astype(str).unique().tolist())
-            combobox = ttk.Combobox(self.filter_values_container, values=values, state='readonly')
-            combobox.pack(fill='x', padx=5, pady=2)
-            if values:
-                combobox.current(0)
-            self.filter_entries[col] = combobox
-
-    def generate_text_report(self):
-        if self.df is None:
-            messagebox.showerror("Error", "No DataFrame loaded.")
-            return
-        filter_cols = [self.filter_listbox.get(i) for i in self.filter_listbox.curselection()]
-        if not filter_cols:
-            messagebox.showerror("Error", "Select at least one filter column.")
-            return
-        criteria = {}
-        for col in filter_cols:
-            val = self.filter_entries.get(col)
-            if val:
-                v = val.get().strip()
-                if v == "":
-                    messagebox.showerror("Error", f"Filter value for '{col}' is empty.")
-                    return
-                criteria[col] = v
-            else:
-                messagebox.showerror("Error", f"Filter value for '{col}' is missing.")
-                return
-        display_cols = [self.display_listbox.get(i) for i in self.display_listbox.curselection()]
-        if not display_cols:
-            messagebox.showerror("Error", "Select at least one display column.")
-            return
-
-        mask = pd.Series(True, index=self.df.index)
-        for col, val in criteria.items():
-            mask &= self.df[col].astype(str) == val
-
-        result = self.df.loc[mask, display_cols]
-        self.report_text.config(state='normal')
-        self.report_text.delete('1.0', tk.END)
-        if result.empty:
-            self.report_text.insert(tk.END, "No data matching the filters.\n")
-        else:
-            self.report_text.insert(tk.END, result.to_string())
-        self.report_text.config(state='disabled')
-
     def create_theme_toggle(self):
         # Add a theme toggle button at the top right corner
         self.theme_var = tk.StringVar(value=self.current_theme)
@@ -223,6 +181,9 @@ class DataApp(tk.Tk):
         self.style.map('TNotebook.Tab',
                        background=[('selected', theme["highlight_color"])],
                        foreground=[('selected', theme["foreground"])])
+        self.style.configure('Treeview', background=theme["text_background"], fieldbackground=theme["text_background"],
+                             foreground=theme["text_foreground"])
+        self.style.map('Treeview', background=[('selected', theme["highlight_color"])])
 
         # Update widgets background and foreground colors
         def recursive_configure(widget):
@@ -266,6 +227,24 @@ class DataApp(tk.Tk):
                 self.excel_path_var.set(file_path)
 
         ttk.Button(frame, text="Browse Excel File", command=browse_file).pack(pady=5)
+
+        workers_frame = ttk.Frame(frame)
+        workers_frame.pack(pady=5)
+        ttk.Label(workers_frame, text="Worker processes:").pack(side='left', padx=5)
+        self.workers_var = tk.IntVar(value=1)
+        ttk.Spinbox(workers_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.workers_var, width=5).pack(side='left')
+
+        self.parquet_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Also write columnar copy (Parquet)", variable=self.parquet_var).pack(pady=5)
+        self.feather_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Also write memory-mapped copy (Feather)", variable=self.feather_var).pack(pady=5)
+        self.compact_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Compact column types (category, downcast numbers)", variable=self.compact_var).pack(pady=5)
+        self.stream_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Streaming mode for very large sheets (columnar files only)", variable=self.stream_var).pack(pady=5)
+        self.stats_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame, text="Precompute column statistics for charts and filters", variable=self.stats_var).pack(pady=5)
+
         ttk.Button(frame, text="Load Excel to Pickle", command=self.load_excel_thread).pack(pady=10)
 
         self.load_status = ttk.Label(frame, text="")
@@ -275,13 +254,31 @@ class DataApp(tk.Tk):
         threading.Thread(target=self.load_excel_action, daemon=True).start()
 
     def load_excel_action(self):
+        from db_loader import load_excel_to_pickle
+        from instrumentation import recorder
         excel_path = self.excel_path_var.get()
         if not os.path.isfile(excel_path):
             self.show_status("Excel file not found.", error=True)
             return
         try:
-            load_excel_to_pickle(excel_path, self.data_dir)
-            self.show_status("Excel sheets loaded to pickle files successfully.")
+            workers = self.workers_var.get()
+        except tk.TclError:
+            self.show_status("Worker count must be a number.", error=True)
+            return
+        try:
+            formats = ('pickle',)
+            if self.parquet_var.get():
+                formats += ('parquet',)
+            if self.feather_var.get():
+                formats += ('feather',)
+            with recorder.measure('ingest', file=os.path.basename(excel_path), formats=formats) as record:
+                timings = load_excel_to_pickle(excel_path, self.data_dir, workers=workers, formats=formats,
+                                               compact=self.compact_var.get(), stream=self.stream_var.get(),
+                                               stats=self.stats_var.get())
+                record['result_rows'] = len(timings)
+            total = sum(parse_time + write_time for parse_time, write_time in timings.values())
+            self.show_status(f"Excel sheets loaded to pickle files successfully "
+                             f"({len(timings)} sheets rebuilt, {total:.2f} s of sheet work).")
             self.refresh_pkl_files()
         except Exception as e:
             self.show_status(f"Error loading Excel: {e}", error=True)
@@ -298,10 +295,18 @@ class DataApp(tk.Tk):
         self.pkl_var = tk.StringVar()
         self.pkl_combo = ttk.Combobox(frame, textvariable=self.pkl_var, state='readonly', width=50)
         self.pkl_combo.pack(pady=5)
-        self.refresh_pkl_files()
+        self.pkl_combo.bind('<<ComboboxSelected>>', lambda e: self.show_preview())
 
         ttk.Button(frame, text="Load DataFrame", command=self.load_dataframe).pack(pady=10)
 
+        # Recently loaded datasets stay in memory, so switching back to one is instant
+        session_frame = ttk.Frame(frame)
+        session_frame.pack(pady=5)
+        ttk.Label(session_frame, text="Keep recent datasets in memory up to (MB):").pack(side='left')
+        self.session_mb_var = tk.IntVar(value=1024)
+        ttk.Spinbox(session_frame, from_=0, to=65536, increment=256, textvariable=self.session_mb_var,
+                    width=7).pack(side='left', padx=5)
+
         self.df_info = tk.Text(frame, height=15, width=80, state='disabled', wrap='none')
         self.df_info.pack(pady=10, fill='both', expand=True)
 
@@ -314,39 +319,84 @@ class DataApp(tk.Tk):
         xscroll.pack(side='bottom', fill='x')
         self.df_info['xscrollcommand'] = xscroll.set
 
+        self.refresh_pkl_files()
+
     def refresh_pkl_files(self):
-        if os.path.isdir(self.data_dir):
-            self.pkl_files = [f for f in os.listdir(self.data_dir) if f.endswith('.pkl')]
-        else:
-            self.pkl_files = []
+        from storage import list_tables
+        self.pkl_files = list_tables(self.data_dir)
+        if self.pkl_combo is None:
+            return
         self.pkl_combo['values'] = self.pkl_files
         if self.pkl_files:
             self.pkl_combo.current(0)
+            self.show_preview()
+
+    def show_preview(self):
+        from storage import read_preview
+        selected_file = self.pkl_var.get()
+        if not selected_file:
+            return
+        # Stored at ingest: shows columns and first rows without reading the sheet
+        try:
+            preview = read_preview(os.path.join(self.data_dir, selected_file))
+        except Exception as e:
+            self.set_df_info(f"Preview unavailable: {e}")
+            return
+        if preview is None:
+            self.set_df_info(f"No preview stored for {selected_file}. Load it to see its columns.")
+        else:
+            self.show_dataframe_info(preview, selected_file)
 
     def load_dataframe(self):
+        from instrumentation import recorder
+        from session_cache import SessionCache
         selected_file = self.pkl_var.get()
         if not selected_file:
             messagebox.showerror("Error", "Please select a pickle file.")
             return
+        try:
+            budget = self.session_mb_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "Memory limit must be a number.")
+            return
+        if self.session is None:
+            self.session = SessionCache(budget)
+        self.session.max_bytes = budget * 1024 * 1024
         try:
             path = os.path.join(self.data_dir, selected_file)
-            self.df = pd.read_pickle(path)
-            self.df.columns = self.df.columns.str.strip()
-            self.show_dataframe_info()
+            # Re-store the dataset being left: it may have grown a full frame or indexes since it was opened
+            if self.dataset is not None:
+                self.session.keep(self.dataset)
+            with recorder.measure('load', file=selected_file) as record:
+                # Opened from its stored preview; the table itself is read when a report needs it
+                dataset, cached = self.session.open(path)
+                record['details']['cached'] = cached
+                if dataset.df is not None:
+                    record['rows'] = len(dataset.df)
+                record['result_rows'] = dataset.preview['rows']
+            self.dataset = dataset
+            self.df_path = path
+            self.df_columns = dataset.columns
+            self.df_stats = dataset.stats
+            self.filter_index = dataset.filter_index
+            self.show_dataframe_info(dataset.preview, selected_file)
             self.prepare_report_tab()
-            messagebox.showinfo("Success", f"DataFrame loaded from {selected_file}")
+            messagebox.showinfo("Success", f"DataFrame loaded from {selected_file}" + (" (kept in memory)" if cached else ""))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load DataFrame: {e}")
 
-    def show_dataframe_info(self):
+    def show_dataframe_info(self, preview, name):
+        info_text = f"{name}: {preview['rows']} rows\n\nColumns:\n"
+        for i, col in enumerate(preview['columns'], 1):
+            info_text += f"{i}. {col} ({preview['dtypes'].get(col, '?')})\n"
+        info_text += f"\nFirst {len(preview['head'])} rows:\n"
+        info_text += preview['head'].to_string()
+        self.set_df_info(info_text)
+
+    def set_df_info(self, text):
         self.df_info.config(state='normal')
         self.df_info.delete('1.0', tk.END)
-        info_text = f"Columns:\n"
-        for i, col in enumerate(self.df.columns, 1):
-            info_text += f"{i}. {col}\n"
-        info_text += "\nFirst 5 rows:\n"
-        info_text += self.df.head().to_string()
-        self.df_info.insert(tk.END, info_text)
+        self.df_info.insert(tk.END, text)
         self.df_info.config(state='disabled')
 
     def create_report_tab(self):
@@ -394,32 +444,50 @@ class DataApp(tk.Tk):
         ttk.Button(button_frame, text="Generate Pie Chart", command=self.generate_pie_chart).pack(fill='x', pady=3)
         ttk.Button(button_frame, text="Generate Bar Chart", command=self.generate_bar_chart).pack(fill='x', pady=3)
         ttk.Button(button_frame, text="Generate Pivot Table", command=self.generate_pivot_report).pack(fill='x', pady=3)
+        ttk.Button(button_frame, text="Generate Join Report", command=self.generate_join_report).pack(fill='x', pady=3)
 
         # Text report output
         output_frame = ttk.LabelFrame(frame, text="Report Output")
         output_frame.grid(row=2, column=0, columnspan=2, sticky='nswe', padx=5, pady=5)
 
-        self.report_text = tk.Text(output_frame, height=15, wrap='none')
-        self.report_text.pack(fill='both', expand=True, padx=5, pady=5)
+        # Virtualized grid: only visible rows are formatted, so any result size renders instantly
+        self.report_view = DataFrameView(output_frame)
+        self.report_view.pack(fill='both', expand=True, padx=5, pady=5)
 
-        # Scrollbars for report_text
-        yscroll = ttk.Scrollbar(output_frame, orient='vertical', command=self.report_text.yview)
-        yscroll.pack(side='right', fill='y')
-        self.report_text['yscrollcommand'] = yscroll.set
-
-        xscroll = ttk.Scrollbar(output_frame, orient='horizontal', command=self.report_text.xview)
-        xscroll.pack(side='bottom', fill='x')
-        self.report_text['xscrollcommand'] = xscroll.set
+        # Progress of background report tasks
+        status_frame = ttk.Frame(frame)
+        status_frame.grid(row=3, column=0, columnspan=2, sticky='we', padx=5, pady=5)
+        self.task_progress = ttk.Progressbar(status_frame, mode='indeterminate', length=150)
+        self.task_progress.pack(side='left', padx=5)
+        self.task_label = ttk.Label(status_frame, text="")
+        self.task_label.pack(side='left', padx=5)
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.tasks.cancel, state='disabled')
+        self.cancel_button.pack(side='right', padx=5)
 
         # Configure grid weights
         frame.rowconfigure(2, weight=1)
         frame.columnconfigure(0, weight=1)
         frame.columnconfigure(1, weight=1)
 
+    def show_task_status(self, labels):
+        if self.task_progress is None:
+            return
+        if labels:
+            self.task_label.config(text="Running: " + ", ".join(labels))
+            self.task_progress.start(10)
+            self.cancel_button.config(state='normal')
+        else:
+            self.task_label.config(text="")
+            self.task_progress.stop()
+            self.cancel_button.config(state='disabled')
+
+    def show_task_error(self, title):
+        return lambda error: messagebox.showerror("Error", f"{title}: {error}")
+
     def prepare_report_tab(self):
-        if self.df is None:
+        if self.df_path is None or 'report' not in self.tabs_built:
             return
-        cols = self.df.columns.tolist()
+        cols = self.df_columns
         self.filter_listbox.delete(0, tk.END)
         self.display_listbox.delete(0, tk.END)
         for col in cols:
@@ -428,6 +496,7 @@ class DataApp(tk.Tk):
         self.update_filter_value_entries()
 
     def update_filter_value_entries(self):
+        from column_stats import column_values
         # Clear previous entries
         for widget in self.filter_values_container.winfo_children():
             widget.destroy()
@@ -436,21 +505,111 @@ class DataApp(tk.Tk):
         selected_indices = self.filter_listbox.curselection()
         for idx in selected_indices:
             col = self.filter_listbox.get(idx)
-            label = ttk.Label(self.filter_values_container, text=f"Value for {col}:")
-            label.pack(anchor='w', padx=5, pady=2)
-
-            # Create combobox with unique values from dataframe column
-            values = []
-            if self.df is not None and col in self.df.columns:
-                values = sorted(self.df[col].dropna().astype(str).unique().tolist())
-            combobox = ttk.Combobox(self.filter_values_container, values=values, state='readonly')
-            combobox.pack(fill='x', padx=5, pady=2)
-            if values:
-                combobox.current(0)
-            self.filter_entries[col] = combobox
+            header = ttk.Frame(self.filter_values_container)
+            header.pack(fill='x', padx=5, pady=2)
+            ttk.Label(header, text=f"{col}:").pack(side='left')
+            mode_var = tk.StringVar(value=FILTER_MODES[0])
+            mode_combo = ttk.Combobox(header, textvariable=mode_var, values=FILTER_MODES, state='readonly', width=14)
+            mode_combo.pack(side='right')
+
+            body = ttk.Frame(self.filter_values_container)
+            body.pack(fill='x', padx=5, pady=2)
+            # Multi-select list of distinct values for "is one of" / "is not one of",
+            # plus typed values for columns with too many values to list
+            values_frame = ttk.Frame(body)
+            values_frame.pack(fill='x')
+            listbox = tk.Listbox(values_frame, selectmode='multiple', exportselection=0, height=4)
+            listbox.pack(fill='x')
+            note = ttk.Label(values_frame, text="", foreground='gray')
+            typed_frame = ttk.Frame(values_frame)
+            typed_frame.pack(fill='x')
+            typed_var = tk.StringVar()
+            ttk.Label(typed_frame, text="or type (a|b):").pack(side='left')
+            ttk.Entry(typed_frame, textvariable=typed_var).pack(side='left', fill='x', expand=True, padx=3)
+
+            # Bounds for "between", compared in the column's own type
+            range_frame = ttk.Frame(body)
+            low_var, high_var = tk.StringVar(), tk.StringVar()
+            ttk.Label(range_frame, text="from").pack(side='left')
+            ttk.Entry(range_frame, textvariable=low_var, width=12).pack(side='left', padx=3)
+            ttk.Label(range_frame, text="to").pack(side='left')
+            ttk.Entry(range_frame, textvariable=high_var, width=12).pack(side='left', padx=3)
+
+            mode_combo.bind('<<ComboboxSelected>>',
+                            lambda e, mode_var=mode_var, values_frame=values_frame, range_frame=range_frame:
+                                self.switch_filter_mode(mode_var.get(), values_frame, range_frame))
+            entry = {'mode': mode_var, 'values': listbox, 'note': note, 'typed': typed_var,
+                     'low': low_var, 'high': high_var}
+            self.filter_entries[col] = entry
+            if self.df_path is None or col not in self.df_columns:
+                continue
+            values = column_values(self.df_stats, col)
+            if values is not None:
+                self.fill_filter_values(entry, values)
+            elif self.filter_index.has_distinct(col):
+                self.fill_filter_values(entry, self.filter_index.distinct(col))
+            else:
+                # Distinct values are computed once per dataset in the background
+                listbox.insert(tk.END, "Loading values...")
+                listbox.config(state='disabled')
+                index = self.filter_index
+                self.tasks.submit(('values', col), f"Values of {col}",
+                                  lambda token, index=index, col=col: index.distinct(col),
+                                  lambda values, index=index, entry=entry:
+                                      self.fill_filter_values(entry, values, index),
+                                  self.show_task_error(f"Failed to read values of '{col}'"))
+
+    def switch_filter_mode(self, mode, values_frame, range_frame):
+        shown, hidden = (range_frame, values_frame) if mode == 'between' else (values_frame, range_frame)
+        hidden.pack_forget()
+        shown.pack(fill='x')
+
+    def fill_filter_values(self, entry, values, index=None):
+        from column_stats import MAX_VALUES
+        listbox = entry['values']
+        # Skip results for a list that was rebuilt or a dataset that was replaced meanwhile
+        if index is not None and index is not self.filter_index:
+            return
+        if not listbox.winfo_exists():
+            return
+        listbox.config(state='normal')
+        listbox.delete(0, tk.END)
+        # Millions of Listbox rows would freeze the window: list only the first ones
+        listbox.insert(tk.END, *values[:MAX_VALUES])
+        if len(values) > MAX_VALUES:
+            entry['note'].config(text=f"Showing {MAX_VALUES} of {len(values)} values. "
+                                      f"Type other values below or use 'between'.")
+            entry['note'].pack(fill='x', after=listbox)
+        if values:
+            listbox.selection_set(0)
+
+    def read_filter(self, col, entry):
+        from filter_index import between, isin, not_in
+        # Returns a Condition for the column, or None after reporting what is missing
+        mode = entry['mode'].get()
+        if mode == 'between':
+            low = entry['low'].get().strip() or None
+            high = entry['high'].get().strip() or None
+            if low is None and high is None:
+                messagebox.showerror("Error", f"Enter at least one bound for '{col}'.")
+                return None
+            return between(low, high)
+        listbox = entry['values']
+        typed = [value.strip() for value in entry['typed'].get().split('|') if value.strip()]
+        if str(listbox.cget('state')) == 'disabled' and not typed:
+            messagebox.showinfo("Info", f"Values for '{col}' are still loading.")
+            return None
+        # Typed values replace the list selection, whose first value is preselected
+        values = typed or [listbox.get(i) for i in listbox.curselection()]
+        if not values:
+            messagebox.showerror("Error", f"Select or type at least one value for '{col}'.")
+            return None
+        return isin(values) if mode == 'is one of' else not_in(values)
 
     def generate_text_report(self):
-        if self.df is None:
+        from instrumentation import recorder
+        from query import Query
+        if self.df_path is None:
             messagebox.showerror("Error", "No DataFrame loaded.")
             return
         filter_cols = [self.filter_listbox.get(i) for i in self.filter_listbox.curselection()]
@@ -459,65 +618,118 @@ class DataApp(tk.Tk):
             return
         criteria = {}
         for col in filter_cols:
-            val = self.filter_entries.get(col)
-            if val:
-                v = val.get().strip()
-                if v == "":
-                    messagebox.showerror("Error", f"Filter value for '{col}' is empty.")
-                    return
-                criteria[col] = v
-            else:
+            entry = self.filter_entries.get(col)
+            if not entry:
                 messagebox.showerror("Error", f"Filter value for '{col}' is missing.")
                 return
+            condition = self.read_filter(col, entry)
+            if condition is None:
+                return
+            criteria[col] = condition
         display_cols = [self.display_listbox.get(i) for i in self.display_listbox.curselection()]
         if not display_cols:
             messagebox.showerror("Error", "Select at least one display column.")
             return
 
-        mask = pd.Series(True, index=self.df.index)
-        for col, val in criteria.items():
-            mask &= self.df[col].astype(str) == val
-
-        result = self.df.loc[mask, display_cols]
-        self.report_text.config(state='normal')
-        self.report_text.delete('1.0', tk.END)
+        dataset, index, query = self.dataset, self.filter_index, Query(self.df_path).select(display_cols)
+
+        def run(token):
+            with recorder.measure('filter', columns=[str(col) for col in criteria]) as record:
+                result = select(token, record)
+                if result is not None:
+                    record['result_rows'] = len(result)
+                return result
+
+        def select(token, record):
+            # A .pkl file can't be read in parts: load it once and keep it with the dataset
+            df = dataset.df if dataset.columnar else dataset.frame()
+            if df is None and not index.covers(criteria):
+                # Nothing indexed yet: push the filters down to the file, which
+                # skips row groups by their statistics and reads only needed columns
+                pushed = query.where(criteria)
+                result = pushed.collect(token)
+                record['rows'] = pushed.rows_read
+                return result
+            positions = index.lookup(criteria)
+            if token.cancelled:
+                return None
+            if df is not None:
+                record['rows'] = len(df)
+                return df[display_cols].iloc[positions]
+            picked = query.take(positions)
+            result = picked.collect(token)
+            record['rows'] = picked.rows_read
+            return result
+
+        self.tasks.submit('report', "Text report", run, self.show_report_result,
+                          self.show_task_error("Failed to generate report"))
+
+    def show_report_result(self, result):
         if result.empty:
-            self.report_text.insert(tk.END, "No data matching the filters.\n")
+            self.report_view.show_message("No data matching the filters.")
         else:
-            self.report_text.insert(tk.END, result.to_string())
-        self.report_text.config(state='disabled')
+            self.report_view.set_dataframe(result)
 
     def generate_scatter_plot(self):
-        if self.df is None:
+        if self.df_path is None:
             messagebox.showerror("Error", "No DataFrame loaded.")
             return
-        cols = self.df.columns.tolist()
-        ScatterDialog(self, self.df, cols)
+        self.open_with_dataframe(lambda dataset, df: ScatterDialog(self, df, dataset.columns))
 
     def generate_pie_chart(self):
-        if self.df is None:
+        if self.df_path is None:
             messagebox.showerror("Error", "No DataFrame loaded.")
             return
-        cols = self.df.columns.tolist()
-        PieDialog(self, self.df, cols)
+        self.open_with_stats(lambda dataset, df: PieDialog(self, df, dataset))
 
     def generate_bar_chart(self):
-        if self.df is None:
+        if self.df_path is None:
             messagebox.showerror("Error", "No DataFrame loaded.")
             return
-        cols = self.df.columns.tolist()
-        BarDialog(self, self.df, cols)
+        self.open_with_stats(lambda dataset, df: BarDialog(self, df, dataset))
 
     def generate_pivot_report(self):
-        if self.df is None:
+        if self.df_path is None:
+            messagebox.showerror("Error", "No DataFrame loaded.")
+            return
+        self.open_with_dataframe(lambda dataset, df: PivotDialog(self, df, dataset.fingerprint))
+
+    def generate_join_report(self):
+        if self.df_path is None:
             messagebox.showerror("Error", "No DataFrame loaded.")
             return
-        PivotDialog(self, self.df)
+        others = [f for f in self.pkl_files if os.path.join(self.data_dir, f) != self.df_path]
+        if not others:
+            messagebox.showerror("Error", "No other stored sheets to join with.")
+            return
+        JoinDialog(self, others)
+
+    def open_with_dataframe(self, open_dialog):
+        # Bound to the dataset at click time: another one may be loaded before the frame is read,
+        # and the dialog must not pair this frame with the newer file's fingerprint or stats
+        dataset = self.dataset
+        if dataset.df is not None:
+            open_dialog(dataset, dataset.df)
+            return
+        # Full frame is read in the background on first use
+        self.tasks.submit('load', "Loading data", lambda token: dataset.frame(),
+                          lambda df: open_dialog(dataset, df), self.show_task_error("Failed to load DataFrame"))
+
+    def open_with_stats(self, open_dialog):
+        # Precomputed counts make the full frame unnecessary; the dialog reads
+        # single columns on demand for anything the statistics don't cover
+        dataset = self.dataset
+        if dataset.df is None and dataset.stats is not None:
+            open_dialog(dataset, None)
+        else:
+            self.open_with_dataframe(open_dialog)
 
 class ScatterDialog(tk.Toplevel):
     def __init__(self, parent, df, columns):
+        from chart_canvas import ChartCanvas
         super().__init__(parent)
         self.title("Scatter Plot")
+        self.tasks = parent.tasks
         self.df = df
         self.columns = columns
         self.geometry("600x500")
@@ -536,28 +748,61 @@ class ScatterDialog(tk.Toplevel):
 
         ttk.Button(self, text="Plot", command=self.plot).pack(pady=10)
 
-        self.fig, self.ax = plt.subplots(figsize=(6,4))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.chart = ChartCanvas(self, figsize=(6, 4))
+        self.chart.pack(fill='both', expand=True)
 
     def plot(self):
+        from instrumentation import recorder
+        from scatter_data import prepare_scatter
         x = self.x_var.get()
         y = self.y_var.get()
-        self.ax.clear()
+        if self.chart.is_current((x, y)):
+            return
+        df = self.df
+
+        def run(token):
+            with recorder.measure('chart', kind='scatter', x=str(x), y=str(y)) as record:
+                record['rows'] = len(df)
+                return prepare_scatter(df, x, y)
+
+        # Large frames are binned or sampled in the background, drawing stays cheap
+        self.tasks.submit(('scatter', id(self)), "Scatter data", run,
+                          lambda prepared: self.draw(prepared, x, y), self.show_error)
+
+    def draw(self, prepared, x, y):
+        from scatter_data import draw_scatter
+        if not self.winfo_exists():
+            return
+        # Fresh axes so a density colorbar from the previous plot goes away
+        ax = self.chart.axes(fresh=True)
         try:
-            self.df.plot.scatter(x=x, y=y, ax=self.ax)
-            self.ax.set_title(f"{y} vs {x}")
-            self.ax.grid(True)
-            self.canvas.draw()
+            draw_scatter(ax, prepared, x, y)
+            if prepared['kind'] == 'density':
+                ax.set_title(f"{y} vs {x} (density of {prepared['total']:,} rows)")
+            elif len(prepared['data']) < prepared['total']:
+                ax.set_title(f"{y} vs {x} (sample of {len(prepared['data']):,} / {prepared['total']:,} rows)")
+            else:
+                ax.set_title(f"{y} vs {x}")
+            self.chart.show((x, y))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to plot scatter: {e}")
+            self.show_error(e)
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"Failed to plot scatter: {error}", parent=self)
 
 class PieDialog(tk.Toplevel):
-    def __init__(self, parent, df, columns):
+    def __init__(self, parent, df, dataset):
+        from chart_canvas import ChartCanvas
+        from column_stats import TOP_N
         super().__init__(parent)
         self.title("Pie Chart")
+        self.tasks = parent.tasks
+        # Bound to one dataset, so counts never mix up two files
+        self.load_columns = dataset.read
         self.df = df
-        self.columns = columns
+        self.dataset = dataset.fingerprint
+        self.stats = dataset.stats
+        self.columns = columns = dataset.columns
         self.geometry("600x500")
 
         ttk.Label(self, text="Select column for Pie Chart:").pack(pady=5)
@@ -566,33 +811,80 @@ class PieDialog(tk.Toplevel):
         self.col_combo.pack(pady=5)
         self.col_combo.current(0)
 
+        top_frame = ttk.Frame(self)
+        top_frame.pack(pady=5)
+        ttk.Label(top_frame, text="Top values (0 = all):").pack(side='left', padx=5)
+        self.top_var = tk.IntVar(value=TOP_N)
+        ttk.Spinbox(top_frame, from_=0, to=1000, textvariable=self.top_var, width=6).pack(side='left')
+
         ttk.Button(self, text="Plot", command=self.plot).pack(pady=10)
 
-        self.fig, self.ax = plt.subplots(figsize=(6,6))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.chart = ChartCanvas(self, figsize=(6, 6))
+        self.chart.pack(fill='both', expand=True)
 
     def plot(self):
+        from column_stats import column_value_counts
+        from instrumentation import recorder
+        from result_cache import cached_value_counts
         col = self.col_var.get()
-        self.ax.clear()
         try:
-            value_counts = self.df[col].value_counts()
+            top = self.top_var.get()
+        except tk.TclError:
+            self.show_error("top values must be a number")
+            return
+        if self.chart.is_current((col, top)):
+            return
+        value_counts = column_value_counts(self.stats, col)
+        if value_counts is not None:
+            self.draw(value_counts, col, top)
+            return
+        df, dataset, load_columns = self.df, self.dataset, self.load_columns
+
+        def run(token):
+            with recorder.measure('chart', kind='pie', column=str(col)) as record:
+                frame = df if df is not None else load_columns([col])
+                record['rows'] = len(frame)
+                value_counts = cached_value_counts(frame, col, dataset)
+                record['result_rows'] = len(value_counts)
+                return value_counts
+
+        self.tasks.submit(('pie', id(self)), "Counting values", run,
+                          lambda value_counts: self.draw(value_counts, col, top), self.show_error)
+
+    def draw(self, value_counts, col, top):
+        from column_stats import top_values
+        if not self.winfo_exists():
+            return
+        ax = self.chart.axes()
+        try:
             if value_counts.empty:
-                messagebox.showinfo("Info", "No data for pie chart.")
+                messagebox.showinfo("Info", "No data for pie chart.", parent=self)
                 return
-            value_counts.plot.pie(autopct='%1.1f%%', startangle=360, shadow=True, ax=self.ax)
-            self.ax.set_title(f'Distribution by {col}')
-            self.ax.set_ylabel('')
-            self.canvas.draw()
+            # One artist per shown value: the rest are merged into a single "Other" entry
+            value_counts = top_values(value_counts, top)
+            value_counts.plot.pie(autopct='%1.1f%%', startangle=360, shadow=True, ax=ax)
+            ax.set_title(f'Distribution by {col}')
+            ax.set_ylabel('')
+            self.chart.show((col, top))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to plot pie chart: {e}")
+            self.show_error(e)
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"Failed to plot pie chart: {error}", parent=self)
 
 class BarDialog(tk.Toplevel):
-    def __init__(self, parent, df, columns):
+    def __init__(self, parent, df, dataset):
+        from chart_canvas import ChartCanvas
+        from column_stats import TOP_N
         super().__init__(parent)
         self.title("Bar Chart")
+        self.tasks = parent.tasks
+        # Bound to one dataset, so counts never mix up two files
+        self.load_columns = dataset.read
         self.df = df
-        self.columns = columns
+        self.dataset = dataset.fingerprint
+        self.stats = dataset.stats
+        self.columns = columns = dataset.columns
         self.geometry("600x500")
 
         ttk.Label(self, text="Select column for Bar Chart:").pack(pady=5)
@@ -601,32 +893,74 @@ class BarDialog(tk.Toplevel):
         self.col_combo.pack(pady=5)
         self.col_combo.current(0)
 
+        top_frame = ttk.Frame(self)
+        top_frame.pack(pady=5)
+        ttk.Label(top_frame, text="Top values (0 = all):").pack(side='left', padx=5)
+        self.top_var = tk.IntVar(value=TOP_N)
+        ttk.Spinbox(top_frame, from_=0, to=1000, textvariable=self.top_var, width=6).pack(side='left')
+
         ttk.Button(self, text="Plot", command=self.plot).pack(pady=10)
 
-        self.fig, self.ax = plt.subplots(figsize=(6,4))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.chart = ChartCanvas(self, figsize=(6, 4))
+        self.chart.pack(fill='both', expand=True)
 
     def plot(self):
+        from column_stats import column_value_counts
+        from instrumentation import recorder
+        from result_cache import cached_value_counts
         col = self.col_var.get()
-        self.ax.clear()
         try:
-            value_counts = self.df[col].value_counts()
+            top = self.top_var.get()
+        except tk.TclError:
+            self.show_error("top values must be a number")
+            return
+        if self.chart.is_current((col, top)):
+            return
+        value_counts = column_value_counts(self.stats, col)
+        if value_counts is not None:
+            self.draw(value_counts, col, top)
+            return
+        df, dataset, load_columns = self.df, self.dataset, self.load_columns
+
+        def run(token):
+            with recorder.measure('chart', kind='bar', column=str(col)) as record:
+                frame = df if df is not None else load_columns([col])
+                record['rows'] = len(frame)
+                value_counts = cached_value_counts(frame, col, dataset)
+                record['result_rows'] = len(value_counts)
+                return value_counts
+
+        self.tasks.submit(('bar', id(self)), "Counting values", run,
+                          lambda value_counts: self.draw(value_counts, col, top), self.show_error)
+
+    def draw(self, value_counts, col, top):
+        from column_stats import top_values
+        if not self.winfo_exists():
+            return
+        ax = self.chart.axes()
+        try:
             if value_counts.empty:
-                messagebox.showinfo("Info", "No data for bar chart.")
+                messagebox.showinfo("Info", "No data for bar chart.", parent=self)
                 return
-            value_counts.plot.bar(ax=self.ax)
-            self.ax.set_title(f'Distribution by {col}')
-            self.ax.set_ylabel('Count')
-            self.canvas.draw()
+            # One artist per shown value: the rest are merged into a single "Other" entry
+            value_counts = top_values(value_counts, top)
+            value_counts.plot.bar(ax=ax)
+            ax.set_title(f'Distribution by {col}')
+            ax.set_ylabel('Count')
+            self.chart.show((col, top))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to plot bar chart: {e}")
+            self.show_error(e)
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"Failed to plot bar chart: {error}", parent=self)
 
 class PivotDialog(tk.Toplevel):
-    def __init__(self, parent, df):
+    def __init__(self, parent, df, dataset=None):
         super().__init__(parent)
         self.title("Pivot Table")
+        self.tasks = parent.tasks
         self.df = df
+        self.dataset = dataset
         self.geometry("700x600")
 
         cols = df.columns.tolist()
@@ -656,38 +990,219 @@ class PivotDialog(tk.Toplevel):
 
         ttk.Button(self, text="Generate Pivot Table", command=self.generate_pivot).pack(pady=10)
 
-        self.output_text = tk.Text(self, height=20, wrap='none')
-        self.output_text.pack(fill='both', expand=True, padx=5, pady=5)
+        self.cache_label = ttk.Label(self, text="")
+        self.cache_label.pack()
 
-        yscroll = ttk.Scrollbar(self, orient='vertical', command=self.output_text.yview)
-        yscroll.pack(side='right', fill='y')
-        self.output_text['yscrollcommand'] = yscroll.set
-
-        xscroll = ttk.Scrollbar(self, orient='horizontal', command=self.output_text.xview)
-        xscroll.pack(side='bottom', fill='x')
-        self.output_text['xscrollcommand'] = xscroll.set
+        self.output_view = DataFrameView(self)
+        self.output_view.pack(fill='both', expand=True, padx=5, pady=5)
 
     def generate_pivot(self):
+        from instrumentation import recorder
+        from result_cache import cached_pivot_table
         index_col = self.index_var.get()
         columns_col = self.columns_var.get()
         values_col = self.values_var.get() or None
         aggfunc = self.agg_entry.get().strip()
-
+        df = self.df
+        dataset = self.dataset
+
+        def run(token):
+            with recorder.measure('pivot', index=str(index_col), columns=str(columns_col), aggfunc=aggfunc) as record:
+                record['rows'] = len(df)
+                pivot = cached_pivot_table(df, index_col, columns_col, values_col, aggfunc, dataset=dataset)
+                record['result_rows'] = len(pivot)
+                return pivot
+
+        self.tasks.submit(('pivot', id(self)), "Pivot table", run, self.show_pivot, self.show_error)
+
+    def show_pivot(self, pivot):
+        from result_cache import pivot_cache
+        if self.winfo_exists():
+            self.output_view.set_dataframe(pivot)
+            stats = pivot_cache.stats()
+            self.cache_label.config(text=f"Pivot cache: {stats['hits']} hits, {stats['misses']} misses, "
+                                         f"{stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB")
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"Failed to generate pivot table: {error}", parent=self)
+
+class JoinDialog(tk.Toplevel):
+    def __init__(self, parent, sheets):
+        super().__init__(parent)
+        self.title("Join Report")
+        self.tasks = parent.tasks
+        self.data_dir = parent.data_dir
+        # Bound to the current dataset, like the chart dialogs
+        self.load_base = parent.dataset.frame
+        self.geometry("700x650")
+
+        ttk.Label(self, text="Join with sheet:").pack(pady=5)
+        self.sheet_var = tk.StringVar()
+        self.sheet_combo = ttk.Combobox(self, textvariable=self.sheet_var, values=sheets, state='readonly')
+        self.sheet_combo.pack(pady=5)
+        self.sheet_combo.bind('<<ComboboxSelected>>', lambda e: self.load_sheet_columns())
+
+        ttk.Label(self, text="Key column in current sheet:").pack(pady=5)
+        self.left_var = tk.StringVar()
+        self.left_combo = ttk.Combobox(self, textvariable=self.left_var, values=parent.df_columns, state='readonly')
+        self.left_combo.pack(pady=5)
+        self.left_combo.current(0)
+
+        ttk.Label(self, text="Key column in joined sheet:").pack(pady=5)
+        self.right_var = tk.StringVar()
+        self.right_combo = ttk.Combobox(self, textvariable=self.right_var, state='readonly')
+        self.right_combo.pack(pady=5)
+
+        ttk.Label(self, text="Columns to add (none selected = all):").pack(pady=5)
+        self.columns_listbox = tk.Listbox(self, selectmode='multiple', exportselection=0, height=5)
+        self.columns_listbox.pack(fill='x', padx=10, pady=5)
+
+        self.how_var = tk.StringVar(value='left')
+        how_frame = ttk.Frame(self)
+        how_frame.pack(pady=5)
+        ttk.Radiobutton(how_frame, text="Keep all rows (left join)", variable=self.how_var, value='left').pack(side='left', padx=5)
+        ttk.Radiobutton(how_frame, text="Matched rows only (inner join)", variable=self.how_var, value='inner').pack(side='left', padx=5)
+
+        ttk.Button(self, text="Join", command=self.generate_join).pack(pady=10)
+
+        self.cache_label = ttk.Label(self, text="")
+        self.cache_label.pack()
+
+        self.output_view = DataFrameView(self)
+        self.output_view.pack(fill='both', expand=True, padx=5, pady=5)
+
+        self.sheet_combo.current(0)
+        self.load_sheet_columns()
+
+    def load_sheet_columns(self):
+        from storage import read_preview, read_schema
         try:
-            pivot = pd.pivot_table(
-                self.df,
-                index=index_col,
-                columns=columns_col,
-                values=values_col,
-                aggfunc=aggfunc,
-                fill_value=0,
-            )
-            self.output_text.config(state='normal')
-            self.output_text.delete('1.0', tk.END)
-            self.output_text.insert(tk.END, str(pivot))
-            self.output_text.config(state='disabled')
+            path = os.path.join(self.data_dir, self.sheet_var.get())
+            preview = read_preview(path)
+            columns = preview['columns'] if preview is not None else read_schema(path)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate pivot table: {e}")
+            self.show_error(e)
+            return
+        self.right_combo.config(values=columns)
+        # Default to a key with the same name as the current one
+        left = self.left_var.get()
+        self.right_combo.current(columns.index(left) if left in columns else 0)
+        self.columns_listbox.delete(0, tk.END)
+        self.columns_listbox.insert(tk.END, *columns)
+
+    def generate_join(self):
+        from instrumentation import recorder
+        from join_index import join_tables
+        right_on = self.right_var.get()
+        selected = [self.columns_listbox.get(i) for i in self.columns_listbox.curselection()]
+        join = {
+            'path': os.path.join(self.data_dir, self.sheet_var.get()),
+            'left_on': self.left_var.get(),
+            'right_on': right_on,
+            'columns': [col for col in selected if col != right_on] or None,
+            'how': self.how_var.get(),
+        }
+        load_base, sheet = self.load_base, self.sheet_var.get()
+
+        def run(token):
+            with recorder.measure('join', sheet=sheet, how=join['how']) as record:
+                base = load_base()
+                record['rows'] = len(base)
+                result = join_tables(base, [join], token)
+                if result is not None:
+                    record['result_rows'] = len(result)
+                return result
+
+        self.tasks.submit(('join', id(self)), "Join report", run, self.show_join, self.show_error)
+
+    def show_join(self, result):
+        from join_index import key_index_cache
+        if not self.winfo_exists():
+            return
+        if result.empty:
+            self.output_view.show_message("No matching rows.")
+        else:
+            self.output_view.set_dataframe(result)
+        stats = key_index_cache.stats()
+        self.cache_label.config(text=f"Key index cache: {stats['hits']} hits, {stats['misses']} misses, "
+                                     f"{stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB")
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"Failed to join sheets: {error}", parent=self)
+
+class DiagnosticsDialog(tk.Toplevel):
+    COLUMNS = ('time', 'operation', 'seconds', 'rows', 'result_rows', 'peak_rss_mb', 'peak_growth_mb', 'status', 'details')
+
+    def __init__(self, parent):
+        from instrumentation import recorder
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("900x450")
+        self.recorder = recorder
+        self.shown = None
+        self.refresh_id = None
+
+        controls = ttk.Frame(self)
+        controls.pack(fill='x', padx=10, pady=5)
+        self.profile_var = tk.BooleanVar(value=recorder.profile)
+        ttk.Checkbutton(controls, text="Profile operations (cProfile)", variable=self.profile_var,
+                        command=self.toggle_profile).pack(side='left')
+        ttk.Label(controls, text=f"Log: {os.path.abspath(recorder.log_path)}").pack(side='right')
+
+        frame = ttk.Frame(self)
+        frame.pack(fill='both', expand=True, padx=10, pady=5)
+        self.tree = ttk.Treeview(frame, columns=self.COLUMNS, show='headings')
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col.replace('_', ' '))
+            self.tree.column(col, width=300 if col == 'details' else 90, stretch=col == 'details')
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        self.profile_label = ttk.Label(self, text="")
+        self.profile_label.pack(fill='x', padx=10, pady=5)
+        self.tree.bind('<<TreeviewSelect>>', lambda e: self.show_selected())
+        self.bind('<Destroy>', self.on_destroy)
+        self.refresh()
+
+    def toggle_profile(self):
+        self.recorder.profile = self.profile_var.get()
+
+    def refresh(self):
+        records = self.recorder.snapshot()
+        # Redraw only when something new was recorded, so the selection survives
+        key = (len(records), id(records[-1]) if records else None)
+        if key != self.shown:
+            self.shown = key
+            self.records = records[::-1]
+            self.tree.delete(*self.tree.get_children())
+            for i, record in enumerate(self.records):
+                values = []
+                for col in self.COLUMNS:
+                    value = record.get(col)
+                    if col == 'details':
+                        value = ', '.join(f"{k}={v}" for k, v in value.items())
+                        if record.get('error'):
+                            value = f"{record['error']}; {value}"
+                    elif col == 'seconds':
+                        value = f"{value:.3f}"
+                    values.append('' if value is None else value)
+                self.tree.insert('', 'end', iid=str(i), values=values)
+        self.refresh_id = self.after(1000, self.refresh)
+
+    def on_destroy(self, event):
+        # Children report their own <Destroy> here too; cancel the timer once, for the window
+        if event.widget is self and self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)
+            self.refresh_id = None
+
+    def show_selected(self):
+        selected = self.tree.selection()
+        if not selected:
+            return
+        profile = self.records[int(selected[0])].get('profile')
+        self.profile_label.config(text=f"Profile: {profile}" if profile else "No profile recorded for this operation.")
 
 if __name__ == "__main__":
     app = DataApp()
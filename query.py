@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from filter_index import Condition, coerce_bound, isin, range_values, text_codes
+from storage import columnar_path, read_row_groups, read_schema
+
+
+def _coerce(series: pd.Series, value):
+    """
+    Приводит значение условия (обычно строку из интерфейса) к типу колонки.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return str(value).strip().lower() in ('true', '1')
+    if pd.api.types.is_numeric_dtype(dtype):
+        return float(value)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return pd.Timestamp(value)
+    return str(value)
+
+
+def condition_mask(series: pd.Series, condition: Condition) -> np.ndarray:
+    """
+    Вычисляет условие для колонки так же, как FilterIndex: значения 'in'
+    и 'not_in' сравниваются со строковым видом ячеек, границы диапазона —
+    с ячейками в исходном типе колонки (категории — в типе категорий).
+
+    Returns:
+        np.ndarray: Булев массив; пустые ячейки не удовлетворяют 'range'.
+
+    Raises:
+        ValueError: Границу нельзя привести к типу колонки или значения
+            колонки несравнимы с ней.
+    """
+    if condition.kind == 'range':
+        values, notna = range_values(series)
+        matched = np.ones(len(values), dtype=bool)
+        try:
+            if condition.low is not None:
+                matched &= values >= coerce_bound(values, condition.low, series.name)
+            if condition.high is not None:
+                matched &= values <= coerce_bound(values, condition.high, series.name)
+        except TypeError:
+            raise ValueError(f"Колонка '{series.name}' содержит несравнимые значения, диапазон по ней задать нельзя.")
+        mask = np.zeros(len(series), dtype=bool)
+        mask[notna] = matched
+        return mask
+    codes, uniques = text_codes(series)
+    matched = pd.Index(uniques).isin(condition.values)[codes]
+    return matched if condition.kind == 'in' else ~matched
+
+
+def _may_match(condition: Condition, statistics) -> bool:
+    """
+    Проверяет по минимуму и максимуму группы строк, может ли в ней
+    найтись строка, удовлетворяющая условию. При сомнениях возвращает True.
+    """
+    if statistics is None:
+        return True
+    low, high, nulls = statistics
+    probe = pd.Series([low])
+    try:
+        if condition.kind == 'range':
+            if condition.low is not None and high < _coerce(probe, condition.low):
+                return False
+            if condition.high is not None and low > _coerce(probe, condition.high):
+                return False
+            return True
+        if condition.kind == 'in':
+            values = [_coerce(probe, value) for value in condition.values]
+            # Text of an empty cell ('nan', 'NaT') may match, and empty cells are outside min/max
+            return any(pd.isna(value) or low <= value <= high for value in values)
+        # Only a group holding nothing but excluded values can be skipped;
+        # values are compared as text, like the cells in condition_mask
+        return not (low == high and nulls == 0 and probe.astype(str)[0] in condition.values)
+    except (TypeError, ValueError):
+        return True
+
+
+class Query:
+    """
+    Ленивый запрос к справочнику: условия отбора строк и список колонок.
+
+    Ничего не читает до вызова collect(). Для Parquet-копии условия
+    проверяются по статистике групп строк (группы без подходящих строк
+    не читаются), а с диска читаются только колонки условий и результата.
+    Условия вычисляются так же, как в FilterIndex (см. condition_mask).
+    Для остальных форматов справочник читается целиком (для Feather — через
+    отображение в память) и фильтруется так же.
+    """
+
+    def __init__(self, path: str, criteria: dict = None, columns: list = None, positions: np.ndarray = None):
+        self.path = path
+        self.criteria = dict(criteria or {})
+        self.columns = list(columns) if columns is not None else None
+        self.positions = positions
+        self.rows_read = 0
+
+    def where(self, criteria: dict) -> 'Query':
+        """
+        Возвращает запрос с добавленными условиями {колонка: значение или Condition}.
+        """
+        merged = dict(self.criteria)
+        for col, condition in criteria.items():
+            merged[col] = condition if isinstance(condition, Condition) else isin([condition])
+        return Query(self.path, merged, self.columns, self.positions)
+
+    def select(self, columns: list) -> 'Query':
+        """
+        Возвращает запрос, читающий только колонки `columns`.
+        """
+        return Query(self.path, self.criteria, columns, self.positions)
+
+    def take(self, positions: np.ndarray) -> 'Query':
+        """
+        Возвращает запрос, ограниченный строками с номерами `positions`
+        (например, найденными через FilterIndex): с диска читаются только
+        группы строк, в которые они попадают.
+        """
+        return Query(self.path, self.criteria, self.columns, np.sort(np.asarray(positions)))
+
+    def _read_columns(self):
+        if self.columns is None:
+            return None
+        return list(dict.fromkeys(list(self.columns) + list(self.criteria)))
+
+    def _keep(self, offset: int, rows: int, statistics: dict) -> bool:
+        if self.positions is not None:
+            start, stop = np.searchsorted(self.positions, [offset, offset + rows])
+            if start == stop:
+                return False
+        return all(_may_match(condition, statistics.get(col)) for col, condition in self.criteria.items())
+
+    def explain(self) -> str:
+        """
+        Описывает, как будет выполнен запрос.
+        """
+        source = columnar_path(self.path) or self.path
+        lines = [f"Источник: {source}"]
+        lines.append(f"Колонки: {', '.join(map(str, self._read_columns())) if self.columns is not None else 'все'}")
+        for col, condition in self.criteria.items():
+            lines.append(f"Условие: {col} {condition!r}")
+        if self.positions is not None:
+            lines.append(f"Строки: {len(self.positions)} по номерам")
+        if source.endswith('.parquet'):
+            lines.append("Группы строк отбираются по статистике, колонки читаются выборочно.")
+        return '\n'.join(lines)
+
+    def collect(self, token=None) -> pd.DataFrame:
+        """
+        Выполняет запрос.
+
+        Parameters:
+            token: Объект с атрибутом `cancelled` (см. task_runner.CancelToken);
+                при отмене чтение прекращается и возвращается None.
+
+        Количество прочитанных с диска строк сохраняется в `rows_read`.
+
+        Returns:
+            pd.DataFrame: Подходящие строки; индекс — номера строк в справочнике.
+        """
+        parts = []
+        self.rows_read = 0
+        for offset, chunk in read_row_groups(self.path, self._read_columns(), self._keep):
+            if token is not None and token.cancelled:
+                return None
+            self.rows_read += len(chunk)
+            mask = np.ones(len(chunk), dtype=bool)
+            if self.positions is not None:
+                start, stop = np.searchsorted(self.positions, [offset, offset + len(chunk)])
+                mask[:] = False
+                mask[self.positions[start:stop] - offset] = True
+            for col, condition in self.criteria.items():
+                if mask.any():
+                    mask &= condition_mask(chunk[col], condition)
+            rows = np.flatnonzero(mask)
+            part = chunk.iloc[rows]
+            if self.columns is not None:
+                part = part[self.columns]
+            part.index = rows + offset
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=self.columns if self.columns is not None else read_schema(self.path))
+        return pd.concat(parts) if len(parts) > 1 else parts[0]
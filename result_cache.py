@@ -0,0 +1,279 @@
+import os
+import sys
+import pickle
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import pandas as pd
+from column_stats import count_values
+
+
+def dataset_fingerprint(path: str) -> tuple:
+    """
+    Возвращает отпечаток файла справочника: (абсолютный путь, время изменения, размер).
+
+    Отпечаток меняется при любой перезаписи файла, поэтому результаты,
+    посчитанные по старой версии, больше не находятся в кэше.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+_frame_fingerprints = {}
+
+
+def frame_fingerprint(df: pd.DataFrame) -> tuple:
+    """
+    Возвращает отпечаток содержимого DataFrame, не связанного с файлом.
+
+    Считается по хэшам строк один раз и хранится, пока жив сам DataFrame.
+    """
+    key = id(df)
+    fingerprint = _frame_fingerprints.get(key)
+    if fingerprint is None:
+        hashes = pd.util.hash_pandas_object(df, index=True)
+        fingerprint = ('frame', tuple(df.columns), len(df), int(hashes.sum()))
+        _frame_fingerprints[key] = fingerprint
+        weakref.finalize(df, _frame_fingerprints.pop, key, None)
+    return fingerprint
+
+
+def _size_of(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Кэш результатов с вытеснением давно неиспользуемых записей
+    при превышении заданного объема памяти.
+
+    Считает попадания и промахи; методы можно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Возвращает сохраненное значение или None.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value) -> None:
+        """
+        Сохраняет значение. Значения больше всего кэша не сохраняются.
+        """
+        size = _size_of(value)
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def invalidate(self, predicate) -> int:
+        """
+        Удаляет записи, для ключей которых `predicate(key)` истинно.
+
+        Returns:
+            int: Количество удаленных записей.
+        """
+        with self._lock:
+            stale = [key for key in self._items if predicate(key)]
+            for key in stale:
+                self._bytes -= self._items.pop(key)[1]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Возвращает счетчики кэша: попадания, промахи, число записей и объем в байтах.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._items), 'bytes': self._bytes}
+
+
+class DiskCache:
+    """
+    Кэш результатов на диске, общий для всех сеансов и пользователей,
+    работающих с одной папкой данных.
+
+    Записи лежат в `<папка данных>/.cache/<имя файла>/`, имя записи начинается
+    с времени изменения и размера исходного файла, поэтому при перезаписи файла
+    записи старой версии удаляются. При превышении `max_bytes` удаляются записи,
+    к которым дольше всего не обращались.
+    """
+
+    DIR_NAME = '.cache'
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, dataset: tuple, query: tuple) -> tuple:
+        path, mtime_ns, size = dataset
+        root = os.path.join(os.path.dirname(path), self.DIR_NAME)
+        folder = os.path.join(root, os.path.basename(path))
+        prefix = f'{mtime_ns}-{size}-'
+        digest = hashlib.sha256(repr(query).encode('utf-8')).hexdigest()[:32]
+        return root, folder, prefix, os.path.join(folder, prefix + digest + '.pkl')
+
+    def get(self, dataset: tuple, query: tuple):
+        """
+        Возвращает сохраненный результат или None.
+        """
+        *_, entry = self._entry_path(dataset, query)
+        try:
+            with open(entry, 'rb') as f:
+                stored_query, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        if stored_query != query:
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, dataset: tuple, query: tuple, value) -> None:
+        """
+        Сохраняет результат. Ошибки записи (например, нет прав) игнорируются.
+        """
+        root, folder, prefix, entry = self._entry_path(dataset, query)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            for name in os.listdir(folder):
+                if not name.startswith(prefix):
+                    os.remove(os.path.join(folder, name))
+            tmp_path = f'{entry}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((query, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry)
+            self._evict(root)
+        except OSError:
+            pass
+
+    def _evict(self, root: str) -> None:
+        entries = []
+        for folder in os.scandir(root):
+            if folder.is_dir():
+                for entry in os.scandir(folder.path):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+pivot_cache = LRUCache()
+counts_cache = LRUCache(64 * 1024 * 1024)
+disk_cache = DiskCache()
+
+
+def cached_result(memory: LRUCache, dataset: tuple, query: tuple, compute):
+    """
+    Возвращает результат запроса из кэша в памяти, затем из кэша на диске,
+    а если его нет нигде — вычисляет через `compute()` и сохраняет в оба.
+
+    Parameters:
+        memory (LRUCache): Кэш в памяти.
+        dataset (tuple): Отпечаток файла (см. dataset_fingerprint) или DataFrame
+            (см. frame_fingerprint). Кэш на диске используется только для файлов.
+        query (tuple): Описание запроса, например ('pivot', index, columns, ...).
+        compute (callable): Функция без аргументов, вычисляющая результат.
+    """
+    on_disk = dataset[0] != 'frame'
+    if on_disk:
+        # Results for older versions of the same file can never be hit again
+        path = dataset[0]
+        memory.invalidate(lambda key: key[0][0] == path and key[0] != dataset)
+
+    key = (dataset, query)
+    result = memory.get(key)
+    if result is not None:
+        return result
+    if on_disk:
+        result = disk_cache.get(dataset, query)
+    if result is None:
+        result = compute()
+        if on_disk:
+            disk_cache.put(dataset, query, result)
+    memory.put(key, result)
+    return result
+
+
+def cached_value_counts(df: pd.DataFrame, col, dataset: tuple = None) -> pd.Series:
+    """
+    Возвращает df[col].value_counts() с кэшированием в памяти и на диске.
+
+    Частоты считаются через column_stats.count_values.
+    """
+    if dataset is None:
+        dataset = frame_fingerprint(df)
+    return cached_result(counts_cache, dataset, ('value_counts', col), lambda: count_values(df[col]))
+
+
+def cached_pivot_table(df: pd.DataFrame, index, columns, values=None, aggfunc='mean',
+                       dataset: tuple = None) -> pd.DataFrame:
+    """
+    Строит сводную таблицу через pd.pivot_table с кэшированием результата.
+
+    Parameters:
+        df (pd.DataFrame): Исходная таблица.
+        index, columns, values, aggfunc: Параметры pd.pivot_table.
+        dataset (tuple): Отпечаток файла, из которого загружен `df`
+            (см. dataset_fingerprint). Без него отпечаток считается по содержимому,
+            а результат кэшируется только в памяти.
+
+    Returns:
+        pd.DataFrame: Сводная таблица. Возвращаемый объект общий для всех
+        вызовов с теми же параметрами, изменять его нельзя.
+    """
+    if dataset is None:
+        dataset = frame_fingerprint(df)
+    query = ('pivot', index, columns, values, aggfunc)
+    return cached_result(pivot_cache, dataset, query, lambda: pd.pivot_table(
+        df,
+        index=index,
+        columns=columns,
+        values=values,
+        aggfunc=aggfunc,
+        fill_value=0,
+    ))
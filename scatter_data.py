@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from matplotlib.colors import LogNorm
+
+# Больше этого числа точек scatter-график заменяется картой плотности.
+MAX_POINTS = 50000
+
+# Число интервалов по каждой оси для карты плотности.
+DENSITY_BINS = 200
+
+
+def _axis_values(series: pd.Series):
+    """
+    Переводит колонку в числа для гистограммы.
+
+    Returns:
+        tuple: (массив float64 или None для нечисловых колонок, признак дат).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype='datetime64[ns]', na_value=np.datetime64('NaT'))
+        numbers = values.astype('int64').astype('float64')
+        numbers[np.isnat(values)] = np.nan
+        return numbers, True
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series.to_numpy(dtype='float64', na_value=np.nan), False
+    return None, False
+
+
+def prepare_scatter(df: pd.DataFrame, x, y, max_points: int = MAX_POINTS, bins: int = DENSITY_BINS) -> dict:
+    """
+    Готовит данные для scatter-графика по колонкам `x` и `y`.
+
+    До `max_points` строк график строится по всем точкам. Для больших таблиц
+    числовые колонки и даты сводятся к двумерной гистограмме (np.histogram2d),
+    а для прочих колонок берется равномерная случайная выборка из `max_points` строк.
+
+    Returns:
+        dict: {'kind': 'points', 'data': DataFrame, 'total': число строк} или
+        {'kind': 'density', 'counts', 'xedges', 'yedges', 'total'}.
+    """
+    data = df[list(dict.fromkeys([x, y]))]
+    total = len(data)
+    if total <= max_points:
+        return {'kind': 'points', 'data': data, 'total': total}
+
+    x_values, x_dates = _axis_values(data[x])
+    y_values, y_dates = _axis_values(data[y])
+    if x_values is None or y_values is None:
+        rng = np.random.default_rng(0)
+        positions = np.sort(rng.choice(total, size=max_points, replace=False))
+        return {'kind': 'points', 'data': data.iloc[positions], 'total': total}
+
+    valid = ~(np.isnan(x_values) | np.isnan(y_values))
+    counts, xedges, yedges = np.histogram2d(x_values[valid], y_values[valid], bins=bins)
+    if x_dates:
+        xedges = xedges.astype('int64').astype('datetime64[ns]')
+    if y_dates:
+        yedges = yedges.astype('int64').astype('datetime64[ns]')
+    return {'kind': 'density', 'counts': counts, 'xedges': xedges, 'yedges': yedges, 'total': total}
+
+
+def draw_scatter(ax, prepared: dict, x, y) -> None:
+    """
+    Рисует подготовленные prepare_scatter данные на осях `ax`.
+
+    Заголовок не задается: его формирует вызывающий код.
+    """
+    if prepared['kind'] == 'points':
+        prepared['data'].plot.scatter(x=x, y=y, ax=ax)
+    else:
+        counts = np.ma.masked_equal(prepared['counts'].T, 0)
+        mesh = ax.pcolormesh(prepared['xedges'], prepared['yedges'], counts, norm=LogNorm(), cmap='viridis')
+        ax.figure.colorbar(mesh, ax=ax)
+        ax.set_xlabel(str(x))
+        ax.set_ylabel(str(y))
+    ax.grid(True)
@@ -0,0 +1,115 @@
+import os
+import threading
+from column_stats import read_stats
+from filter_index import FilterIndex
+from result_cache import LRUCache, dataset_fingerprint
+from storage import columnar_path, make_preview, read_preview, read_table
+
+SESSION_BUDGET_MB = 1024
+
+
+class OpenDataset:
+    """
+    Справочник, открытый в приложении: предпросмотр (колонки, число строк,
+    первые строки), статистика колонок и индекс фильтров, привязанные к одной
+    версии файла. Сама таблица читается только при первом обращении к ней
+    (см. frame и read).
+    """
+
+    def __init__(self, path: str, fingerprint: tuple, preview: dict, stats, df=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.preview = preview
+        self.columns = preview['columns']
+        self.stats = stats
+        self.df = df
+        self.columnar = columnar_path(path) is not None
+        # Bound to this dataset, so a background build never reads a newer file
+        self.filter_index = FilterIndex(lambda col: self.read([col])[col])
+        self._lock = threading.Lock()
+
+    def frame(self):
+        """
+        Возвращает таблицу целиком, читая ее с диска при первом вызове.
+        """
+        if self.df is None:
+            with self._lock:
+                if self.df is None:
+                    self.df = read_table(self.path)
+        return self.df
+
+    def read(self, columns: list = None):
+        """
+        Возвращает колонки `columns` (None — все). Из колоночной копии
+        читаются только они, .pkl-файл загружается целиком один раз.
+        """
+        if self.df is None and self.columnar and columns is not None:
+            return read_table(self.path, columns)
+        df = self.frame()
+        return df if columns is None else df[columns]
+
+    @property
+    def nbytes(self) -> int:
+        # Index estimate includes hash tables and text copies of the values (see FilterIndex.nbytes)
+        total = self.filter_index.nbytes + int(self.preview['head'].memory_usage(deep=True).sum())
+        if self.df is not None:
+            total += int(self.df.memory_usage(deep=True).sum())
+        return total
+
+
+def open_dataset(path: str) -> OpenDataset:
+    """
+    Открывает справочник, по возможности не читая его.
+
+    Колонки берутся из предпросмотра, сохраненного при загрузке Excel
+    (или из метаданных колоночной копии). Если предпросмотра нет,
+    таблица читается целиком.
+    """
+    fingerprint = dataset_fingerprint(path)
+    preview, df = read_preview(path), None
+    if preview is None:
+        df = read_table(path)
+        preview = make_preview(df)
+    return OpenDataset(path, fingerprint, preview, read_stats(path), df)
+
+
+class SessionCache(LRUCache):
+    """
+    Недавно открытые справочники в памяти с вытеснением давно неиспользуемых
+    при превышении бюджета. Ключ — отпечаток файла (путь, время изменения,
+    размер), поэтому после перезаписи файла старая версия удаляется
+    и справочник читается заново.
+    """
+
+    def __init__(self, max_mb: int = SESSION_BUDGET_MB):
+        super().__init__(max_mb * 1024 * 1024)
+
+    def open(self, path: str) -> tuple:
+        """
+        Возвращает справочник из кэша или открывает его с диска.
+
+        Returns:
+            tuple: (OpenDataset, True, если справочник взят из кэша).
+        """
+        fingerprint = dataset_fingerprint(path)
+        path = os.path.abspath(path)
+        self.invalidate(lambda key: key[0] == path and key != fingerprint)
+        dataset = self.get(fingerprint)
+        if dataset is not None:
+            return dataset, True
+        dataset = open_dataset(path)
+        self.put(dataset.fingerprint, dataset)
+        return dataset, False
+
+    def keep(self, dataset: OpenDataset) -> None:
+        """
+        Сохраняет справочник заново, чтобы учесть дочитанную таблицу
+        и построенные с момента открытия индексы. Устаревшие версии
+        (файл с тех пор перезаписан или удален) не сохраняются.
+        """
+        try:
+            current = dataset_fingerprint(dataset.path)
+        except OSError:
+            return
+        if current == dataset.fingerprint:
+            self.put(dataset.fingerprint, dataset)
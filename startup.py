@@ -0,0 +1,56 @@
+import sys
+import time
+import importlib
+
+START = time.perf_counter()
+
+# Heavy modules in dependency order, so each entry's time is its own share
+PRELOAD_MODULES = (
+    'numpy',
+    'pandas',
+    'matplotlib',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_tkagg',
+    'storage',
+    'column_stats',
+    'filter_index',
+    'result_cache',
+    'query',
+    'join_index',
+    'scatter_data',
+    'chart_canvas',
+    'db_loader',
+)
+
+events = []
+
+
+def mark(label):
+    events.append((label, time.perf_counter() - START, None))
+
+
+def timed_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    events.append((f"import {name}", started - START, time.perf_counter() - started))
+    return module
+
+
+def preload(modules=PRELOAD_MODULES, token=None):
+    for name in modules:
+        if token is not None and token.cancelled:
+            return
+        timed_import(name)
+    mark("background imports done")
+
+
+def report():
+    lines = ["Startup timings (seconds since main.py started):"]
+    for label, at, took in events:
+        if took is None:
+            lines.append(f"  {at:7.3f}  {label}")
+        else:
+            lines.append(f"  {at:7.3f}  {label} ({took:.3f} s)")
+    return "\n".join(lines)
@@ -0,0 +1,393 @@
+import os
+import pickle
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = feather = pq = None
+
+# Поддерживаемые форматы хранения листов: имя формата -> расширение файла.
+FORMATS = {
+    'pickle': '.pkl',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Колоночные форматы в порядке предпочтения при чтении.
+# Feather (Arrow IPC без сжатия) отображается в память и читается без копирования.
+COLUMNAR_FORMATS = ('feather', 'parquet')
+
+# Файл предпросмотра листа (колонки, типы, число строк и первые строки),
+# который записывается при загрузке Excel рядом с файлами листа.
+PREVIEW_EXT = '.preview'
+PREVIEW_ROWS = 5
+
+
+def _require_pyarrow(fmt: str) -> None:
+    if pa is None:
+        raise ImportError(f"Для формата '{fmt}' требуется пакет pyarrow (pip install pyarrow).")
+
+
+def table_path(output_dir: str, name: str, fmt: str) -> str:
+    """
+    Возвращает путь к файлу листа `name` в формате `fmt`.
+    """
+    return os.path.join(output_dir, f'{name}{FORMATS[fmt]}')
+
+
+def write_table(df: pd.DataFrame, output_dir: str, name: str, formats=('pickle',)) -> list:
+    """
+    Сохраняет DataFrame в каждом из указанных форматов.
+
+    .pkl-файл пишется первым независимо от порядка в `formats`: колоночные
+    копии рядом с ним используются, только если они не старее его
+    (см. _columnar_source).
+
+    Returns:
+        list: Пути к записанным файлам.
+    """
+    paths = []
+    for fmt in sorted(formats, key=lambda fmt: fmt != 'pickle'):
+        path = table_path(output_dir, name, fmt)
+        if fmt == 'pickle':
+            df.to_pickle(path)
+        elif fmt == 'parquet':
+            _require_pyarrow(fmt)
+            df.to_parquet(path, engine='pyarrow', index=False)
+        elif fmt == 'feather':
+            _require_pyarrow(fmt)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            feather.write_feather(table, path, compression='uncompressed')
+        else:
+            raise ValueError(f"Неизвестный формат хранения: {fmt}")
+        paths.append(path)
+    return paths
+
+
+class ChunkWriter:
+    """
+    Записывает лист по частям в колоночные форматы без сборки всей таблицы в памяти.
+
+    Схема берется из первой записанной части; Parquet получает по группе строк
+    на каждую часть, Feather — по пакету записей. Файлы пишутся во временные
+    пути и подменяются только в close(), поэтому прерванная запись не оставляет
+    недописанных файлов.
+    """
+
+    def __init__(self, output_dir: str, name: str, formats=('parquet',)):
+        for fmt in formats:
+            if fmt not in COLUMNAR_FORMATS:
+                raise ValueError(f"Формат '{fmt}' не поддерживает запись по частям.")
+            _require_pyarrow(fmt)
+        self.paths = {fmt: table_path(output_dir, name, fmt) for fmt in formats}
+        self.schema = None
+        self._writers = {}
+
+    def write(self, table) -> None:
+        """
+        Дописывает часть листа (pyarrow.Table).
+        """
+        if self.schema is None:
+            self.schema = table.schema
+            for fmt, path in self.paths.items():
+                if fmt == 'parquet':
+                    self._writers[fmt] = pq.ParquetWriter(path + '.tmp', self.schema)
+                else:
+                    self._writers[fmt] = pa.ipc.new_file(path + '.tmp', self.schema)
+        for writer in self._writers.values():
+            writer.write_table(table)
+
+    def close(self) -> list:
+        """
+        Завершает запись и переносит файлы на место.
+
+        Returns:
+            list: Пути к записанным файлам.
+        """
+        for writer in self._writers.values():
+            writer.close()
+        for path in self.paths.values():
+            os.replace(path + '.tmp', path)
+        return list(self.paths.values())
+
+    def abort(self) -> None:
+        """
+        Прерывает запись и удаляет временные файлы.
+        """
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+        for path in self.paths.values():
+            if os.path.isfile(path + '.tmp'):
+                os.remove(path + '.tmp')
+
+
+def remove_other_formats(output_dir: str, name: str, formats) -> None:
+    """
+    Удаляет файлы листа `name` в форматах, которых нет в `formats`,
+    чтобы при чтении не подхватить копию от прошлой загрузки.
+    """
+    for fmt in FORMATS:
+        path = table_path(output_dir, name, fmt)
+        if fmt not in formats and os.path.isfile(path):
+            os.remove(path)
+
+
+def remove_table(output_dir: str, name: str) -> None:
+    """
+    Удаляет файлы листа `name` во всех форматах и его предпросмотр.
+    """
+    paths = [table_path(output_dir, name, fmt) for fmt in FORMATS]
+    paths.append(os.path.join(output_dir, name + PREVIEW_EXT))
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def list_tables(data_dir: str) -> list:
+    """
+    Возвращает имена файлов в `data_dir`, которые можно открыть как справочник.
+
+    Если лист сохранен в нескольких форматах, в списке остается один файл
+    (.pkl, иначе первый колоночный), а остальные копии используются при чтении
+    автоматически.
+    """
+    if not os.path.isdir(data_dir):
+        return []
+    rank = {FORMATS[fmt]: i for i, fmt in enumerate(('pickle',) + COLUMNAR_FORMATS)}
+    chosen = {}
+    for f in os.listdir(data_dir):
+        name, ext = os.path.splitext(f)
+        if ext in rank and (name not in chosen or rank[ext] < chosen[name][1]):
+            chosen[name] = (f, rank[ext])
+    return sorted(f for f, _ in chosen.values())
+
+
+def _columnar_source(path: str):
+    """
+    Возвращает (путь, формат) актуальной колоночной копии файла или None.
+
+    Копия рядом с .pkl-файлом используется, только если она не старее самого .pkl.
+    """
+    base, ext = os.path.splitext(path)
+    for fmt in COLUMNAR_FORMATS:
+        if ext == FORMATS[fmt]:
+            return path, fmt
+    if pa is None:
+        return None
+    for fmt in COLUMNAR_FORMATS:
+        candidate = base + FORMATS[fmt]
+        if os.path.isfile(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(path):
+            return candidate, fmt
+    return None
+
+
+def columnar_path(path: str):
+    """
+    Возвращает путь к актуальной колоночной копии файла или None.
+    """
+    source = _columnar_source(path)
+    return source[0] if source else None
+
+
+def _open_mapped(path: str):
+    """
+    Открывает Feather-файл через отображение в память.
+
+    Буферы таблицы ссылаются на страницы файла в кэше ОС, поэтому несколько
+    процессов, открывших один файл, делят одну физическую копию данных.
+    """
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def _mapped_to_pandas(table) -> pd.DataFrame:
+    # ArrowDtype keeps the column data in the mapped Arrow buffers instead of
+    # copying it into NumPy arrays / Python objects
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def read_table(path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Загружает справочник из файла.
+
+    Parameters:
+        path (str): Путь к .pkl-, .parquet- или .feather-файлу.
+        columns (list): Колонки, которые нужно прочитать (None — все).
+            При наличии колоночной копии с диска читаются только они.
+            Feather-копия отображается в память и не копируется в процесс.
+
+    Returns:
+        pd.DataFrame: Загруженная таблица.
+    """
+    source = _columnar_source(path)
+    if source is not None:
+        source, fmt = source
+        _require_pyarrow(fmt)
+        if fmt == 'feather':
+            table = _open_mapped(source)
+            if columns is not None:
+                table = table.select(columns)
+            return _mapped_to_pandas(table)
+        df = pd.read_parquet(source, engine='pyarrow', columns=columns)
+        df.columns = df.columns.str.strip()
+        return df
+
+    df = pd.read_pickle(path)
+    df.columns = df.columns.str.strip()
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def _row_group_statistics(metadata, index: int, names: dict) -> dict:
+    statistics = {}
+    row_group = metadata.row_group(index)
+    for name, position in names.items():
+        stats = row_group.column(position).statistics
+        if stats is not None and stats.has_min_max:
+            statistics[name] = (stats.min, stats.max, stats.null_count)
+    return statistics
+
+
+def read_row_groups(path: str, columns: list = None, keep=None):
+    """
+    Читает справочник частями — по группам строк Parquet-файла.
+
+    Группы, для которых `keep(offset, rows, statistics)` ложно, не читаются
+    с диска; statistics — {колонка: (минимум, максимум, число пустых)}
+    по метаданным группы (колонки без статистики в словарь не попадают).
+    Feather- и .pkl-файлы отдаются одной частью.
+
+    Yields:
+        tuple: (номер первой строки части, pd.DataFrame).
+    """
+    source = _columnar_source(path)
+    if source is None or source[1] != 'parquet':
+        yield 0, read_table(path, columns)
+        return
+
+    parquet = pq.ParquetFile(source[0])
+    metadata = parquet.metadata
+    names = {metadata.schema.column(i).name.strip(): i for i in range(metadata.num_columns)}
+    raw_names = {metadata.schema.column(i).name.strip(): metadata.schema.column(i).name
+                 for i in range(metadata.num_columns)}
+    read_columns = None if columns is None else [raw_names.get(col, col) for col in columns]
+    offset = 0
+    for i in range(metadata.num_row_groups):
+        rows = metadata.row_group(i).num_rows
+        if keep is None or keep(offset, rows, _row_group_statistics(metadata, i, names)):
+            df = parquet.read_row_group(i, columns=read_columns).to_pandas()
+            df.columns = df.columns.str.strip()
+            yield offset, df
+        offset += rows
+
+
+def read_schema(path: str) -> list:
+    """
+    Возвращает список колонок справочника, по возможности не читая данные.
+    """
+    source = _columnar_source(path)
+    if source is not None:
+        source, fmt = source
+        _require_pyarrow(fmt)
+        if fmt == 'feather':
+            schema = pa.ipc.open_file(pa.memory_map(source, 'r')).schema
+        else:
+            schema = pq.read_schema(source)
+        return [name.strip() for name in schema.names if not name.startswith('__index_level_')]
+    return read_table(path).columns.tolist()
+
+
+def read_head(path: str, n: int = 5) -> pd.DataFrame:
+    """
+    Возвращает первые `n` строк справочника, по возможности не читая файл целиком.
+    """
+    source = _columnar_source(path)
+    if source is not None:
+        source, fmt = source
+        _require_pyarrow(fmt)
+        if fmt == 'feather':
+            return _mapped_to_pandas(_open_mapped(source).slice(0, n))
+        batches = pq.ParquetFile(source).iter_batches(batch_size=n)
+        batch = next(batches, None)
+        if batch is None:
+            return pd.DataFrame(columns=read_schema(path))
+        df = batch.to_pandas()
+        df.columns = df.columns.str.strip()
+        return df.head(n)
+    return read_table(path).head(n)
+
+
+def make_preview(df: pd.DataFrame, rows: int = None) -> dict:
+    """
+    Составляет предпросмотр таблицы.
+
+    Parameters:
+        df (pd.DataFrame): Таблица или ее первая часть (при потоковой загрузке).
+        rows (int): Общее число строк (None — len(df)).
+
+    Returns:
+        dict: {'columns': список колонок, 'dtypes': {колонка: тип},
+               'rows': число строк, 'head': первые PREVIEW_ROWS строк}.
+    """
+    return {
+        'columns': df.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'rows': len(df) if rows is None else rows,
+        'head': df.head(PREVIEW_ROWS).copy(),
+    }
+
+
+def preview_path(data_path: str) -> str:
+    """
+    Возвращает путь к файлу предпросмотра для файла справочника (любого формата).
+    """
+    return os.path.splitext(data_path)[0] + PREVIEW_EXT
+
+
+def write_preview(preview: dict, output_dir: str, name: str) -> str:
+    """
+    Сохраняет предпросмотр листа `name` рядом с его файлами.
+    """
+    path = os.path.join(output_dir, name + PREVIEW_EXT)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(preview, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_preview(data_path: str):
+    """
+    Загружает предпросмотр справочника, не читая сам справочник.
+
+    Если файла предпросмотра нет или он старее файла данных, предпросмотр
+    собирается по метаданным колоночной копии (если она есть).
+
+    Returns:
+        dict или None: Предпросмотр (см. make_preview) или None, если без
+        чтения всего файла его не получить.
+    """
+    path = preview_path(data_path)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(data_path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    source = _columnar_source(data_path)
+    if source is None or pa is None:
+        return None
+    source, fmt = source
+    if fmt == 'feather':
+        rows = _open_mapped(source).num_rows
+    else:
+        rows = pq.ParquetFile(source).metadata.num_rows
+    return make_preview(read_head(data_path, PREVIEW_ROWS), rows)
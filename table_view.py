@@ -0,0 +1,110 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+# Treeview that shows a DataFrame of any size: only the rows currently
+# visible are formatted and inserted, the rest are produced on scroll.
+class DataFrameView(ttk.Frame):
+    def __init__(self, parent, column_width=120, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.df = None
+        self.offset = 0
+        self.visible_rows = 20
+        self.column_width = column_width
+        self.row_height = int(ttk.Style(self).lookup('Treeview', 'rowheight') or 20)
+
+        self.tree = ttk.Treeview(self, show='tree headings', selectmode='browse')
+        self.yscroll = ttk.Scrollbar(self, orient='vertical', command=self.on_scroll)
+        self.xscroll = ttk.Scrollbar(self, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.xscroll.set)
+
+        self.tree.grid(row=0, column=0, sticky='nswe')
+        self.yscroll.grid(row=0, column=1, sticky='ns')
+        self.xscroll.grid(row=1, column=0, sticky='we')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>', '<Prior>', '<Next>'):
+            self.tree.bind(sequence, self.on_wheel)
+
+    def set_dataframe(self, df):
+        if hasattr(df, 'to_frame'):
+            df = df.to_frame()
+        self.df = df
+        self.offset = 0
+        columns = [self.column_label(col) for col in df.columns]
+        ids = [f'c{i}' for i in range(len(columns))]
+        self.tree.configure(columns=ids)
+        index_name = ' / '.join(str(n) for n in df.index.names if n is not None)
+        self.tree.heading('#0', text=index_name)
+        self.tree.column('#0', width=self.column_width, stretch=False)
+        for col_id, label in zip(ids, columns):
+            self.tree.heading(col_id, text=label)
+            self.tree.column(col_id, width=max(self.column_width, 8 * len(label)), stretch=False)
+        self.render()
+
+    def show_message(self, message):
+        self.df = None
+        self.offset = 0
+        self.tree.configure(columns=())
+        self.tree.heading('#0', text='')
+        self.tree.column('#0', width=max(self.column_width, 8 * len(message)), stretch=True)
+        self.tree.delete(*self.tree.get_children())
+        self.tree.insert('', tk.END, text=message)
+        self.yscroll.set(0, 1)
+
+    @staticmethod
+    def column_label(col):
+        if isinstance(col, tuple):
+            return ' / '.join(str(part) for part in col if str(part) != '')
+        return str(col)
+
+    def render(self):
+        self.tree.delete(*self.tree.get_children())
+        if self.df is None:
+            return
+        total = len(self.df)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        window = self.df.iloc[self.offset:self.offset + self.visible_rows + 1]
+        for label, row in zip(window.index, window.itertuples(index=False, name=None)):
+            text = self.column_label(label)
+            self.tree.insert('', tk.END, text=text, values=['' if v is None else str(v) for v in row])
+        if total:
+            self.yscroll.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.yscroll.set(0, 1)
+
+    def scroll_rows(self, delta):
+        if self.df is None:
+            return
+        self.offset += delta
+        self.render()
+
+    def on_wheel(self, event):
+        if event.keysym == 'Prior':
+            self.scroll_rows(-self.visible_rows)
+        elif event.keysym == 'Next':
+            self.scroll_rows(self.visible_rows)
+        elif event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_rows(-3)
+        else:
+            self.scroll_rows(3)
+        return 'break'
+
+    def on_scroll(self, action, amount, unit=None):
+        if self.df is None:
+            return
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.df))
+            self.render()
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_rows(int(amount) * step)
+
+    def on_resize(self, event):
+        # Heading takes roughly one row; keep at least one data row
+        rows = max(1, event.height // self.row_height - 1)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
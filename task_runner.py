@@ -0,0 +1,91 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+# Runs pandas work off the Tk main thread. Each task has a key; submitting a
+# new task with the same key supersedes the previous one, whose result is then
+# dropped. Results are delivered on the main thread by polling with after(),
+# so callbacks may touch widgets freely.
+class TaskRunner:
+    POLL_MS = 50
+
+    def __init__(self, widget, on_status=None, max_workers=2):
+        self.widget = widget
+        self.on_status = on_status
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self.tasks = {}
+        self.polling = False
+
+    def submit(self, key, label, func, on_done, on_error=None):
+        self.cancel(key)
+        token = CancelToken()
+        future = self.executor.submit(func, token)
+        self.tasks[key] = (future, token, label, on_done, on_error)
+        self.report_status()
+        if not self.polling:
+            self.polling = True
+            self.widget.after(self.POLL_MS, self.poll)
+        return token
+
+    def cancel(self, key=None):
+        keys = list(self.tasks) if key is None else [key]
+        for k in keys:
+            task = self.tasks.pop(k, None)
+            if task is not None:
+                future, token = task[0], task[1]
+                token.cancel()
+                future.cancel()
+        self.report_status()
+
+    def is_busy(self, key=None):
+        return bool(self.tasks) if key is None else key in self.tasks
+
+    def poll(self):
+        try:
+            for key, (future, token, label, on_done, on_error) in list(self.tasks.items()):
+                if not future.done():
+                    continue
+                del self.tasks[key]
+                if not token.cancelled:
+                    self.deliver(future, on_done, on_error)
+            self.report_status()
+        finally:
+            if self.tasks:
+                self.widget.after(self.POLL_MS, self.poll)
+            else:
+                self.polling = False
+
+    def deliver(self, future, on_done, on_error):
+        try:
+            error = future.exception()
+            if error is None:
+                on_done(future.result())
+                return
+        except Exception as e:
+            error = e
+        if on_error is not None:
+            try:
+                on_error(error)
+            except Exception:
+                traceback.print_exc()
+
+    def report_status(self):
+        if self.on_status is not None:
+            self.on_status([task[2] for task in self.tasks.values()])
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
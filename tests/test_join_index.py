@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+from join_index import KeyIndex, _key_values
+
+
+def test_match_against_sheet_without_keys():
+    index = KeyIndex(_key_values(pd.Series([np.nan, np.nan]), True))
+    left, right = index.match(pd.Series(['a', 'b']), True)
+    assert left.tolist() == [0, 1]
+    assert right.tolist() == [-1, -1]
+    left, right = index.match(pd.Series(['a', 'b']), True, how='inner')
+    assert len(left) == 0 and len(right) == 0
+
+
+@pytest.mark.parametrize('how', ['left', 'inner'])
+def test_match_agrees_with_merge(how):
+    base = pd.DataFrame({'key': ['a', 'b', None, 'c', 'a']})
+    other = pd.DataFrame({'key': ['a', 'a', 'c', None], 'value': [1, 2, 3, 4]})
+    index = KeyIndex(_key_values(other['key'], True))
+    left, right = index.match(base['key'], True, how)
+    expected = base.reset_index().merge(other.dropna().reset_index(), on='key', how=how)
+    expected = expected.sort_values(['index_x', 'index_y'], kind='stable')
+    assert left.tolist() == expected['index_x'].tolist()
+    assert right.tolist() == expected['index_y'].fillna(-1).astype(int).tolist()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from filter_index import FilterIndex, between, isin, not_in
+from query import Query
+from storage import table_path, write_table
+
+
+def make_frame():
+    return pd.DataFrame({
+        'price': [100.0, 2.5, np.nan, 100.0, 7.0, 2.5],
+        'count': [1, 2, 3, 4, 5, 6],
+        'name': ['a', 'b', None, 'a', 'c', 'b'],
+        'kind': pd.Categorical(['x', 'y', 'x', None, 'z', 'y']),
+        'date': pd.to_datetime(['2020-01-01', '2020-02-01', None, '2020-03-01', '2020-01-15', '2020-02-01']),
+    })
+
+
+@pytest.fixture(params=['parquet', 'feather'])
+def stored(request, tmp_path):
+    df = make_frame()
+    write_table(df, str(tmp_path), 'table', ('pickle', request.param))
+    if request.param == 'parquet':
+        # Several row groups, so their statistics are used to skip some of them
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, table_path(str(tmp_path), 'table', 'parquet'), row_group_size=2)
+    return df, table_path(str(tmp_path), 'table', 'pickle')
+
+
+CRITERIA = [
+    {'price': isin(['100'])},
+    {'price': isin(['100.0'])},
+    {'price': isin(['abc'])},
+    {'price': isin(['nan'])},
+    {'price': not_in(['100.0'])},
+    {'price': between('2', '50')},
+    {'count': isin(['3', '5'])},
+    {'count': between(None, '4')},
+    {'name': isin(['a', 'c'])},
+    {'name': not_in(['b'])},
+    {'kind': isin(['y'])},
+    {'kind': between('x', 'y')},
+    {'date': isin(['2020-02-01'])},
+    {'date': between('2020-01-10', '2020-02-15')},
+    {'price': isin(['2.5']), 'name': isin(['b'])},
+]
+
+
+@pytest.mark.parametrize('criteria', CRITERIA, ids=repr)
+def test_index_and_pushdown_select_same_rows(stored, criteria):
+    df, path = stored
+    index = FilterIndex(lambda col: df[col])
+    expected = index.lookup(criteria).tolist()
+    assert Query(path).where(criteria).collect().index.tolist() == expected
+
+
+@pytest.mark.parametrize('criteria', [{'price': between('abc')}, {'date': between(None, 'later')}], ids=repr)
+def test_bad_bound_is_reported_on_both_paths(stored, criteria):
+    df, path = stored
+    with pytest.raises(ValueError, match='Неверная граница диапазона'):
+        FilterIndex(lambda col: df[col]).lookup(criteria)
+    with pytest.raises(ValueError, match='Неверная граница диапазона'):
+        Query(path).where(criteria).collect()